@@ -6,22 +6,175 @@ from google.genai import types
 
 # read api key from .env file
 import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from hashlib import blake2b
 from dotenv import load_dotenv
+from storage.serialization import dumps_json
 load_dotenv()
 
+MODEL = "gemini-3-flash-preview"
+
 client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
 
-config=types.GenerateContentConfig(
-    thinking_config=types.ThinkingConfig(thinking_level="low")
-)
+# --- Response cache: exact match on (model, prompt, schema) ---
+# Raw JSON text is stored (callers parse it), in a small SQLite file that survives restarts,
+# fronted by an in-process LRU. Only responses that validate against their schema are stored.
+LLM_CACHE_PATH = os.getenv("BRAINOS_LLM_CACHE", os.path.expanduser("~/.brainos/llm_cache.db"))
+_MEMORY_SIZE = 4096
+_memory = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_conn = None
+
+def _cache_db():
+    global _cache_conn
+    if _cache_conn is None:
+        os.makedirs(os.path.dirname(LLM_CACHE_PATH) or ".", exist_ok=True)
+        _cache_conn = sqlite3.connect(LLM_CACHE_PATH, check_same_thread=False)
+        _cache_conn.execute("PRAGMA journal_mode=WAL")
+        _cache_conn.execute("CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, response TEXT)")
+    return _cache_conn
+
+@lru_cache(maxsize=32)
+def _json_schema(schema) -> dict:
+    # model_json_schema() walks every nested model; build it once per schema class
+    return schema.model_json_schema()
+
+@lru_cache(maxsize=32)
+def _schema_json(schema) -> str:
+    return dumps_json(_json_schema(schema))
+
+def _cache_key(prompt, schema) -> str:
+    return blake2b(f"{MODEL}\0{_schema_json(schema)}\0{prompt}".encode(), digest_size=20).hexdigest()
+
+def _remember(key, text):
+    _memory[key] = text
+    _memory.move_to_end(key)
+    if len(_memory) > _MEMORY_SIZE: _memory.popitem(last=False)
+
+def _cache_get(key):
+    with _cache_lock:
+        text = _memory.get(key)
+        if text is None:
+            row = _cache_db().execute("SELECT response FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None: return None
+            text = row[0]
+        _remember(key, text)
+        return text
 
-def generate_content(prompt, schema):
-    config.response_mime_type = "application/json"
-    config.response_json_schema = schema.model_json_schema()
+def _cache_put(key, text, schema, accept=None):
+    try:
+        parsed = schema.model_validate_json(text)
+    except ValueError:
+        return  # truncated / off-schema output would otherwise be replayed forever
+    if accept is not None and not accept(parsed):
+        return  # valid but incomplete for the caller (e.g. skipped batch items)
+    with _cache_lock:
+        _remember(key, text)
+        conn = _cache_db()
+        conn.execute("INSERT OR REPLACE INTO llm_cache (key, response) VALUES (?, ?)", (key, text))
+        conn.commit()
+
+@lru_cache(maxsize=32)
+def _config_for(schema):
+    """One JSON-mode config per response schema, built once and never mutated afterwards,
+    so concurrent calls with different schemas cannot see each other's settings."""
+    return types.GenerateContentConfig(
+        thinking_config=types.ThinkingConfig(thinking_level="low"),
+        response_mime_type="application/json",
+        response_json_schema=_json_schema(schema)
+    )
+
+def generate_content(prompt, schema, cache=True):
+    key = _cache_key(prompt, schema)
+    if cache and (hit := _cache_get(key)) is not None:
+        return hit
+    config = _config_for(schema)
 
     response = client.models.generate_content(
-        model="gemini-3-flash-preview",
+        model=MODEL,
+        contents=prompt,
+        config=config
+    )
+    text = response.text.strip()
+    _cache_put(key, text, schema)
+    return text
+
+def generate_content_stream(prompt, schema, cache=True):
+    """Yield the JSON response text chunk by chunk as the model decodes it (a cache hit is one chunk)."""
+    key = _cache_key(prompt, schema)
+    if cache and (hit := _cache_get(key)) is not None:
+        yield hit
+        return
+    config = _config_for(schema)
+
+    parts = []
+    for chunk in client.models.generate_content_stream(
+        model=MODEL,
+        contents=prompt,
+        config=config
+    ):
+        if chunk.text:
+            parts.append(chunk.text)
+            yield chunk.text
+    _cache_put(key, "".join(parts).strip(), schema)
+
+def new_async_client():
+    """Fresh async client per batch: its HTTP session is bound to the event loop of one asyncio.run()."""
+    return genai.Client(api_key=os.getenv("GOOGLE_API_KEY")).aio
+
+async def generate_content_async(aclient, prompt, schema, cache=True, accept=None):
+    """`accept(parsed) -> bool` optionally narrows which schema-valid responses are cached and replayed."""
+    key = _cache_key(prompt, schema)
+    if cache and (hit := _cache_get(key)) is not None and (accept is None or accept(schema.model_validate_json(hit))):
+        return hit
+    config = _config_for(schema)
+
+    response = await aclient.models.generate_content(
+        model=MODEL,
         contents=prompt,
         config=config
     )
-    return response.text.strip()
\ No newline at end of file
+    text = response.text.strip()
+    _cache_put(key, text, schema, accept)
+    return text
+
+# --- Batch mode: non-interactive jobs at batch pricing, results arrive minutes to hours later ---
+_BATCH_DONE = {
+    types.JobState.JOB_STATE_SUCCEEDED, types.JobState.JOB_STATE_PARTIALLY_SUCCEEDED,
+    types.JobState.JOB_STATE_FAILED, types.JobState.JOB_STATE_CANCELLED, types.JobState.JOB_STATE_EXPIRED,
+}
+
+def generate_content_batch(prompts, schema, display_name=None, poll_seconds=30):
+    """Run `prompts` as one Gemini batch job and return the response texts in order.
+
+    Prompts already in the response cache are not resubmitted; a request that failed inside
+    the job comes back as None.
+    """
+    keys = [_cache_key(p, schema) for p in prompts]
+    texts = [_cache_get(k) for k in keys]
+    pending = [i for i, t in enumerate(texts) if t is None]
+    if not pending:
+        return texts
+
+    config = _config_for(schema)
+    job = client.batches.create(
+        model=MODEL,
+        src=[types.InlinedRequest(contents=prompts[i], config=config) for i in pending],
+        config=types.CreateBatchJobConfig(display_name=display_name)
+    )
+    while job.state not in _BATCH_DONE:
+        time.sleep(poll_seconds)
+        job = client.batches.get(name=job.name)
+    if job.state not in (types.JobState.JOB_STATE_SUCCEEDED, types.JobState.JOB_STATE_PARTIALLY_SUCCEEDED):
+        raise RuntimeError(f"Batch job {job.name} ended in {job.state}: {job.error}")
+
+    for i, res in zip(pending, job.dest.inlined_responses):
+        if res.response is None or not res.response.text:
+            continue
+        texts[i] = res.response.text.strip()
+        _cache_put(keys[i], texts[i], schema)
+    return texts
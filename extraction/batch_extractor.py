@@ -0,0 +1,27 @@
+from typing import List, Union
+from client import generate_content_batch
+from .models import ExtractionResult
+from .prompts import get_combined_extraction_prompt
+from .extractor import extraction_failed
+from .errors import ExtractionError
+
+def extract_data_batch_offline(texts: List[str], type_constraints: str, poll_seconds: int = 30) -> List[Union[ExtractionResult, ExtractionError]]:
+    """Extract a corpus through the Gemini Batch API (about half the cost, no latency guarantee).
+
+    Blocks until the job finishes; meant for bulk ingests, not interactive saves. `type_constraints`
+    is the prompt block from format_type_constraints(), since there is no session registry offline.
+    Results keep the order of `texts`; a failed item is its ExtractionError.
+    Raises RuntimeError if the whole job fails, is cancelled or expires.
+    """
+    prompts = [get_combined_extraction_prompt(t, type_constraints) for t in texts]
+    responses = generate_content_batch(prompts, ExtractionResult, display_name=f"brain-os extraction ({len(texts)} texts)",
+                                       poll_seconds=poll_seconds)
+
+    results = []
+    for raw in responses:
+        try:
+            if raw is None: raise ValueError("Request failed inside the batch job")
+            results.append(ExtractionResult.model_validate_json(raw))
+        except Exception as e:
+            results.append(extraction_failed(e, raw or ""))
+    return results
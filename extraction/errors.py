@@ -0,0 +1,11 @@
+class ExtractionError(Exception):
+    """An LLM response could not be turned into the requested schema.
+
+    Raised by the extraction library instead of reporting to the UI; `raw` keeps the response text.
+    """
+    def __init__(self, message: str, raw: str = ""):
+        super().__init__(message)
+        self.raw = raw
+
+class SynthesisError(ExtractionError):
+    """A merge synthesis failed; the merge must not be applied."""
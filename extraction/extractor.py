@@ -1,31 +1,138 @@
+import asyncio
+import logging
 import streamlit as st
-from client import generate_content
-from .models import ExtractionResult
-from .prompts import get_combined_extraction_prompt
+from typing import Callable, Iterable, List, Optional, Union
+from pydantic import ValidationError
+from pydantic_core import from_json
+from client import generate_content_stream, generate_content_async, new_async_client
+from .models import ExtractedEntity, ExtractionResult, BatchExtractionResult
+from .prompts import get_combined_extraction_prompt, get_marshaled_extraction_prompt
+from .errors import ExtractionError
+
+logger = logging.getLogger(__name__)
+
+def _type_constraint_line(t) -> str:
+    info = f"- {t.machine_name} ({t.category}): {t.description}."
+    if t.allowed_entity_types:
+        info += f" Source: {t.allowed_entity_types.get('source')}. Target: {t.allowed_entity_types.get('target')}."
+    return info
+
+def format_type_constraints(types: Iterable) -> str:
+    """Prompt block listing the active (non-deprecated) relationship types."""
+    return "\n".join(_type_constraint_line(t) for t in types if not t.deprecated) or "No predefined types."
 
 def _build_type_constraints() -> str:
-    type_list = []
-    if "relationship_types" in st.session_state and st.session_state.relationship_types:
-        for t in st.session_state.relationship_types.values():
-            if t.deprecated: continue
-            info = f"- {t.machine_name} ({t.category}): {t.description}."
-            if t.allowed_entity_types:
-                info += f" Source: {t.allowed_entity_types.get('source')}. Target: {t.allowed_entity_types.get('target')}."
-            type_list.append(info)
-    return "\n".join(type_list) if type_list else "No predefined types."
-
-def extract_data(text: str) -> ExtractionResult:
-    """Combined Extraction: Entities and Relationships in one pass"""
+    # Session registry; rebuilt only when it changes (rel_types_version is bumped by the adapter's reindex)
+    ss = st.session_state
+    version = ss.get("rel_types_version", 0)
+    cached = ss.get("type_constraints_cache")
+    if cached and cached[0] == version:
+        return cached[1]
+    text = format_type_constraints(ss.relationship_types.values() if ss.get("relationship_types") else ())
+    ss.type_constraints_cache = (version, text)
+    return text
+
+def extraction_failed(e: Exception, raw: str) -> ExtractionError:
+    """The ExtractionError for a response that could not be parsed; `raw` travels with it."""
+    logger.debug("Combined extraction failed. Raw response start: %.500s", raw)
+    err = ExtractionError(f"Extraction Error: {e}", raw)
+    err.__cause__ = e
+    return err
+
+def _emit_finished_entities(raw: str, emitted: int, on_entity: Callable[[ExtractedEntity], None]) -> int:
+    """Parse the partial response and report entities that are closed; returns the new emitted count."""
+    try:
+        partial = from_json(raw, allow_partial=True)
+    except ValueError:
+        return emitted
+    if not isinstance(partial, dict): return emitted
+    ents = partial.get("entities") or []
+    # The last entity may still be streaming until the relationships key shows up
+    done = ents if "relationships" in partial else ents[:-1]
+    for d in done[emitted:]:
+        try: on_entity(ExtractedEntity.model_validate(d))
+        except ValidationError: pass
+    return max(emitted, len(done))
+
+def extract_data(text: str, on_entity: Optional[Callable[[ExtractedEntity], None]] = None) -> ExtractionResult:
+    """Combined Extraction: Entities and Relationships in one pass.
+
+    The response is streamed; `on_entity` is called for each entity as soon as its JSON object closes.
+    Raises ExtractionError when the response cannot be parsed.
+    """
     
     # Combined Extraction Step
     prompt_combined = get_combined_extraction_prompt(text, _build_type_constraints())
     
     res_combined = ""
     try:
-        res_combined = generate_content(prompt_combined, ExtractionResult)
+        emitted = 0
+        for chunk in generate_content_stream(prompt_combined, ExtractionResult):
+            res_combined += chunk
+            if on_entity and "}" in chunk:
+                emitted = _emit_finished_entities(res_combined, emitted, on_entity)
         result = ExtractionResult.model_validate_json(res_combined)
         return result
     except Exception as e:
-        print(f"DEBUG: Combined Extraction Failed. Raw response start: {res_combined[:500]}")
-        st.error(f"Extraction Error: {e}")
-        return ExtractionResult(entities=[], relationships=[])
+        raise extraction_failed(e, res_combined)
+
+# Batch entry points return the ExtractionError in place of a failed item instead of raising,
+# so one bad response does not discard the rest of the batch.
+async def _extract_data_async(aclient, semaphore: asyncio.Semaphore, text: str, type_constraints: str) -> Union[ExtractionResult, ExtractionError]:
+    prompt_combined = get_combined_extraction_prompt(text, type_constraints)
+    
+    res_combined = ""
+    try:
+        async with semaphore:
+            res_combined = await generate_content_async(aclient, prompt_combined, ExtractionResult)
+        return ExtractionResult.model_validate_json(res_combined)
+    except Exception as e:
+        return extraction_failed(e, res_combined)
+
+def extract_data_batch(texts: List[str], max_concurrency: int = 8) -> List[Union[ExtractionResult, ExtractionError]]:
+    """Extract many texts concurrently (network-bound); results keep the order of `texts`."""
+    type_constraints = _build_type_constraints()
+
+    async def _gather():
+        semaphore = asyncio.Semaphore(max_concurrency)
+        async with new_async_client() as aclient:
+            return await asyncio.gather(*[
+                _extract_data_async(aclient, semaphore, t, type_constraints) for t in texts
+            ])
+
+    return asyncio.run(_gather())
+
+async def _extract_group_async(aclient, semaphore: asyncio.Semaphore, texts: List[str], type_constraints: str) -> List[Union[ExtractionResult, ExtractionError]]:
+    prompt = get_marshaled_extraction_prompt(texts, type_constraints)
+    
+    ids = set(range(len(texts)))
+    raw = ""
+    try:
+        async with semaphore:
+            # A response that skips items is not cached, so a retry asks the model again
+            raw = await generate_content_async(aclient, prompt, BatchExtractionResult,
+                                               accept=lambda batch: ids <= {r.id for r in batch.results})
+        by_id = {r.id: r for r in BatchExtractionResult.model_validate_json(raw).results}
+    except Exception as e:
+        return [extraction_failed(e, raw)] * len(texts)
+    # An item the model skipped is an error (not an empty result), so it is reported and never persisted
+    return [ExtractionResult(entities=r.entities, relationships=r.relationships) if (r := by_id.get(i))
+            else ExtractionError(f"Extraction Error: model omitted item {i} of a packed request", raw)
+            for i in range(len(texts))]
+
+def extract_data_marshaled(texts: List[str], k: int = 8, max_concurrency: int = 8) -> List[Union[ExtractionResult, ExtractionError]]:
+    """Like extract_data_batch, but packs `k` texts into each request so the static prompt prefill is shared.
+
+    Gains are sublinear in k (longer outputs, more skipped items); 4-8 is a sensible range.
+    """
+    type_constraints = _build_type_constraints()
+    groups = [texts[i:i + k] for i in range(0, len(texts), k)]
+
+    async def _gather():
+        semaphore = asyncio.Semaphore(max_concurrency)
+        async with new_async_client() as aclient:
+            return await asyncio.gather(*[
+                _extract_group_async(aclient, semaphore, g, type_constraints) for g in groups
+            ])
+
+    return [r for group in asyncio.run(_gather()) for r in group]
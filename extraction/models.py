@@ -1,8 +1,16 @@
-from pydantic import BaseModel, Field
+from functools import cached_property
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import List, Optional, Dict, Any
 from ontology.enums import EntityType, UsageContext, UncertaintyLevel
 
+# LLM output DTOs are never mutated after parsing.
+_DTO_CONFIG = ConfigDict(frozen=True, extra='ignore')
+
+_ENTITY_TYPE_VALUES = frozenset(e.value for e in EntityType)
+
 class ExtractedEntity(BaseModel):
+    model_config = _DTO_CONFIG
+
     name: str = Field(description="Name of the entity")
     type: EntityType = Field(description="Type of the entity")
     description: str = Field(description="Brief description of the entity context")
@@ -12,7 +20,17 @@ class ExtractedEntity(BaseModel):
     goals: List[str] = Field(default_factory=list, description="Explicit goals or objectives")
     non_goals: List[str] = Field(default_factory=list, description="Explicit non-goals or constraints")
 
+    @field_validator('type', mode='before')
+    @classmethod
+    def _coerce_type(cls, v):
+        # One set lookup on the common exact-match path; fix casing ("concept") otherwise.
+        if isinstance(v, str) and v not in _ENTITY_TYPE_VALUES:
+            return v.title()
+        return v
+
 class ExtractedRelationship(BaseModel):
+    model_config = _DTO_CONFIG
+
     machine_name: str = Field(description="The machine_name of the relationship type")
     source_entity: str = Field(description="Name of source entity")
     target_entity: str = Field(description="Name of target entity")
@@ -24,10 +42,28 @@ class ExtractedRelationship(BaseModel):
     polarity: Optional[str] = Field(description="Positive, Negative, or Neutral", default=None)
     confidence: float = Field(description="Extraction confidence score (0.0 to 1.0)")
 
+    @cached_property
+    def evidence_lc(self) -> str:
+        # Lower-cased once and shared by every rule that scans the evidence (the model is frozen)
+        return (self.evidence_span or "").lower()
+
 class ExtractionResult(BaseModel):
+    model_config = _DTO_CONFIG
+
     entities: List[ExtractedEntity]
     relationships: List[ExtractedRelationship] = Field(default_factory=list)
 
+class IdentifiedExtractionResult(ExtractionResult):
+    id: int = Field(description="The id of the input text this result belongs to")
+
+class BatchExtractionResult(BaseModel):
+    """Several input texts extracted in one request; results are matched back by id."""
+    model_config = _DTO_CONFIG
+
+    results: List[IdentifiedExtractionResult]
+
 class SynthesisResult(BaseModel):
+    model_config = _DTO_CONFIG
+
     new_description: str
     new_keywords: List[str]
@@ -1,8 +1,9 @@
-def get_combined_extraction_prompt(text: str, type_constraints: str) -> str:
-    return f"""
-    Analyze the text: "{text}"
-    
-    You are an expert Knowledge Graph Engineer performing "Epistemic Extraction".
+from storage.serialization import dumps_json
+
+# Static preamble first, per-session type list next, document text last: every request shares the
+# longest possible identical prefix, which Gemini's implicit prefix caching can reuse.
+EXTRACTION_PREAMBLE = """
+    You are an expert Knowledge Graph Engineer performing "Epistemic Extraction" on the INPUT TEXT at the end of this prompt.
     
     ### PHASE 1: ENTITY EXTRACTION
     Task: Identify all important entities.
@@ -52,8 +53,7 @@ def get_combined_extraction_prompt(text: str, type_constraints: str) -> str:
        - Definition-style explanations answering "how" or "in what way" WITHOUT explicit class assignment must NOT be mapped to 'is_a'.
 
     Task: Extract relationships BETWEEN the entities you just identified following the rules above.
-    - Use ONLY allowed types:
-    {type_constraints}
+    - Use ONLY the types listed under ALLOWED RELATIONSHIP TYPES.
     
     - For each relationship:
       - Fill 'semantic_properties'.
@@ -63,4 +63,27 @@ def get_combined_extraction_prompt(text: str, type_constraints: str) -> str:
       - determine 'axis' (Thematic axis).
       - determine 'polarity' (Positive/Negative/Neutral).
       - Provide confidence.
+
+    ### ALLOWED RELATIONSHIP TYPES
+"""
+
+def get_combined_extraction_prompt(text: str, type_constraints: str) -> str:
+    return f"""{EXTRACTION_PREAMBLE}    {type_constraints}
+
+    ---INPUT TEXT---
+    {text}
+    """
+
+def get_marshaled_extraction_prompt(texts: list, type_constraints: str) -> str:
+    """Same rules as the combined prompt, applied to several texts at once (ids are list positions)."""
+    items = dumps_json([{"id": i, "text": t} for i, t in enumerate(texts)])
+    return f"""{EXTRACTION_PREAMBLE}    {type_constraints}
+
+    ### BATCH MODE
+    The INPUT TEXT is a JSON list of items {{"id", "text"}}. Treat every item as an independent document:
+    apply both phases to each one separately and never relate entities across items.
+    Return one entry in 'results' per item, carrying the item's 'id'.
+
+    ---INPUT TEXT---
+    {items}
     """
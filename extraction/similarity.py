@@ -1,31 +1,46 @@
-import re
-from difflib import SequenceMatcher
-from ontology.schema import EntityNode
+import numpy as np
+import unicodedata
+from functools import lru_cache
+from collections import defaultdict
+from rapidfuzz import fuzz, process
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+from ontology.enums import EntityType
+from ontology.schema import EntityNode, TOKEN_RE
 
+# Names and descriptions repeat across pairs, saves and reruns; str caches its own hash,
+# so a plain lru_cache lookup is already O(1) without an extra hashing layer.
+@lru_cache(maxsize=1 << 16)
 def normalize_entity_name(name: str) -> str:
     return name.lower().strip()
 
-def get_tokens(text):
+@lru_cache(maxsize=1 << 16)
+def get_tokens(text) -> frozenset:
     # Simple regex word tokenizer
-    return set(re.findall(r'\b\w+\b', text.lower()))
+    return frozenset(TOKEN_RE.findall(text.lower()))
 
-def calculate_entity_similarity(e1: EntityNode, e2: EntityNode) -> dict:
-    # 1. Name Similarity (Weight 50%)
-    name_sim = SequenceMatcher(None, e1.name.lower(), e2.name.lower()).ratio()
-    
-    # 2. Desc Similarity (Weight 30%)
-    d1 = get_tokens(e1.description)
-    d2 = get_tokens(e2.description)
-    
-    if not d1 or not d2: desc_sim = 0.0
-    else: desc_sim = len(d1 & d2) / len(d1 | d2)
-    
-    # 3. Keywords Similarity (Weight 20%)
-    k1 = set([k.lower() for k in e1.keywords])
-    k2 = set([k.lower() for k in e2.keywords])
-    if not k1 or not k2: kw_sim = 0.0
-    else: kw_sim = len(k1 & k2) / len(k1 | k2)
-    
+def _jaccard(a: frozenset, b: frozenset) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+def _jaccard_matrix(sets: List[frozenset]) -> np.ndarray:
+    """All-pairs Jaccard of `sets` via a 0/1 incidence matrix: |A&B| = M @ M.T, |A|B| = |A| + |B| - |A&B|."""
+    vocab = {}
+    rows, cols = [], []
+    for i, tokens in enumerate(sets):
+        for tok in tokens:
+            rows.append(i)
+            cols.append(vocab.setdefault(tok, len(vocab)))
+    # float32 keeps the counts exact (< 2^24) at half the memory and BLAS time of float64
+    m = np.zeros((len(sets), max(len(vocab), 1)), dtype=np.float32)
+    m[rows, cols] = 1.0
+    inter = (m @ m.T).astype(np.float64)
+    sizes = m.sum(axis=1, dtype=np.float64)
+    union = sizes[:, None] + sizes[None, :] - inter
+    # Empty vs anything scores 0, as in _jaccard
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+def _weighted(name_sim: float, desc_sim: float, kw_sim: float) -> dict:
+    # Name 50%, description 30%, keywords 20%
     total = (name_sim * 0.5) + (desc_sim * 0.3) + (kw_sim * 0.2)
     return {
         "total": total,
@@ -33,3 +48,142 @@ def calculate_entity_similarity(e1: EntityNode, e2: EntityNode) -> dict:
         "desc": desc_sim,
         "keywords": kw_sim
     }
+
+def calculate_entity_similarity(e1: EntityNode, e2: EntityNode, name_sim: Optional[float] = None,
+                                threshold: Optional[float] = None) -> dict:
+    """Weighted name/description/keyword similarity.
+
+    With `threshold`, pairs that provably cannot score above it return early with desc/keywords = 0.0.
+    """
+    # 1. Name Similarity, unless precomputed by a batch scorer
+    if name_sim is None:
+        # total <= 0.5 * name + 0.5, so a name ratio under 2t - 1 can never pass; rapidfuzz
+        # abandons the comparison (returning 0) as soon as it proves that
+        cutoff = max(0.0, threshold * 200 - 100) if threshold is not None else 0
+        name_sim = fuzz.ratio(e1.name_lc, e2.name_lc, score_cutoff=cutoff) / 100.0
+    if threshold is not None and name_sim * 0.5 + 0.5 <= threshold:
+        return _weighted(name_sim, 0.0, 0.0)
+    
+    # 2. Desc Similarity / 3. Keywords Similarity
+    desc_sim = _jaccard(e1.desc_tokens, e2.desc_tokens)
+    kw_sim = _jaccard(e1.kw_tokens, e2.kw_tokens)
+    return _weighted(name_sim, desc_sim, kw_sim)
+
+@lru_cache(maxsize=1 << 16)
+def _fold_name(name: str) -> str:
+    folded = unicodedata.normalize("NFKD", name)
+    folded = "".join(ch for ch in folded if not unicodedata.combining(ch))
+    return folded.lower().replace(" ", "")
+
+def block_key(e: EntityNode) -> tuple:
+    # First 4 chars of the accent-folded, space-free name, plus the entity type
+    return _fold_name(e.name)[:4], e.type
+
+@lru_cache(maxsize=1 << 16)
+def _name_tokens(name: str) -> frozenset:
+    folded = "".join(ch for ch in unicodedata.normalize("NFKD", name) if not unicodedata.combining(ch))
+    return frozenset(t for t in get_tokens(folded) if len(t) >= 3)
+
+# Token buckets bigger than this are stop-word-like ("the", "of ...") and would reintroduce n^2
+MAX_TOKEN_BLOCK = 200
+
+def _token_block_pairs(entities: List[EntityNode]) -> list:
+    """Pairs sharing a name token (same type) that the prefix blocks do not already cover,
+    e.g. "Gautama Buddha" / "Buddha"."""
+    buckets = defaultdict(list)
+    for e in entities:
+        for tok in _name_tokens(e.name):
+            buckets[(e.type, tok)].append(e)
+    seen = set()
+    pairs = []
+    for bucket in buckets.values():
+        if len(bucket) < 2 or len(bucket) > MAX_TOKEN_BLOCK: continue
+        keys = [block_key(e) for e in bucket]
+        for i in range(len(bucket)):
+            for j in range(i + 1, len(bucket)):
+                if keys[i] == keys[j]: continue
+                a, b = bucket[i], bucket[j]
+                pair_id = (a.id, b.id) if a.id < b.id else (b.id, a.id)
+                if pair_id in seen: continue
+                seen.add(pair_id)
+                pairs.append((a, b))
+    return pairs
+
+# Frozen copy of exactly the fields the scan reads: a background scan works on these, so a merge
+# that rewrites a live EntityNode (set_content) cannot change it under the worker.
+@dataclass(frozen=True, slots=True)
+class EntitySnapshot:
+    id: str
+    name: str
+    type: EntityType
+    name_lc: str
+    desc_tokens: frozenset
+    kw_tokens: frozenset
+
+def entity_snapshot(e: EntityNode) -> EntitySnapshot:
+    return EntitySnapshot(e.id, e.name, e.type, e.name_lc, e.desc_tokens, e.kw_tokens)
+
+def _block_signature(block: List[EntityNode]) -> tuple:
+    return tuple((e.id, e.name_lc, e.desc_tokens, e.kw_tokens) for e in block)
+
+def _score_block(block: List[EntityNode], threshold: float) -> list:
+    # Whole-block score matrix: names in one multithreaded C++ call, descriptions and
+    # keywords as Jaccard matrices from a single matrix product each
+    names = [e.name_lc for e in block]
+    name_sims = process.cdist(names, names, scorer=fuzz.ratio, workers=-1).astype(np.float64) / 100.0
+    desc_sims = _jaccard_matrix([e.desc_tokens for e in block])
+    kw_sims = _jaccard_matrix([e.kw_tokens for e in block])
+    totals = (name_sims * 0.5) + (desc_sims * 0.3) + (kw_sims * 0.2)
+    
+    ii, jj = np.triu_indices(len(block), k=1)
+    hits = totals[ii, jj] > threshold
+    return [(i, j, _weighted(float(name_sims[i, j]), float(desc_sims[i, j]), float(kw_sims[i, j])))
+            for i, j in zip(ii[hits].tolist(), jj[hits].tolist())]
+
+def find_duplicate_candidates(entities: List[EntityNode], threshold: float = 0.6,
+                              on_progress: Optional[Callable[[int, int], None]] = None,
+                              block_cache: Optional[dict] = None) -> list:
+    """Score only pairs inside the same block instead of all n*(n-1)/2 pairs.
+
+    Blocks are name-prefix blocks (scored as matrices) plus shared-name-token pairs across them.
+    `entities` may be EntityNodes or EntitySnapshots; pairs come back as the objects passed in.
+    `block_cache` (owned by the caller, one per entity set) keeps each block's hits between scans:
+    block key -> (threshold, block signature, [(i, j, scores)]), so a rescan only rescores the
+    blocks whose members or content changed.
+    """
+    blocks = defaultdict(list)
+    for e in entities:
+        blocks[block_key(e)].append(e)
+    extra_pairs = _token_block_pairs(entities)
+
+    total = sum(len(b) * (len(b) - 1) // 2 for b in blocks.values()) + len(extra_pairs)
+    found = []
+    done = 0
+    for key, block in blocks.items():
+        if len(block) < 2: continue
+        if block_cache is None:
+            hits = _score_block(block, threshold)
+        else:
+            sig = _block_signature(block)
+            cached = block_cache.get(key)
+            if cached is not None and cached[0] == threshold and cached[1] == sig:
+                hits = cached[2]
+            else:
+                hits = _score_block(block, threshold)
+                block_cache[key] = (threshold, sig, hits)
+        found.extend((block[i], block[j], scores) for i, j, scores in hits)
+        done += len(block) * (len(block) - 1) // 2
+        if on_progress: on_progress(done, total)
+    if block_cache is not None:
+        # Forget blocks that no longer exist (merged or deleted entities)
+        for key in block_cache.keys() - blocks.keys():
+            del block_cache[key]
+
+    for a, b in extra_pairs:
+        scores = calculate_entity_similarity(a, b, threshold=threshold)
+        if scores["total"] > threshold:
+            found.append((a, b, scores))
+    if extra_pairs:
+        done += len(extra_pairs)
+        if on_progress: on_progress(done, total)
+    return found
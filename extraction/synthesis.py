@@ -1,13 +1,16 @@
-import streamlit as st
+import asyncio
+import logging
 from textwrap import dedent
-from client import generate_content
+from typing import List, Tuple, Union
+from client import generate_content, generate_content_async, new_async_client
 from extraction.models import SynthesisResult, ExtractedEntity
 from ontology.schema import EntityNode
+from extraction.errors import SynthesisError
 
-def synthesize_entity_info(current_entity: EntityNode, new_info: ExtractedEntity) -> SynthesisResult:
-    """Merge old and new information"""
-    
-    prompt = dedent(f"""
+logger = logging.getLogger(__name__)
+
+def _synthesis_prompt(current_entity: EntityNode, new_info: ExtractedEntity) -> str:
+    return dedent(f"""
         Merge knowledge for the entity: "{current_entity.name}".
         
         1. Old data: "{current_entity.description}" 
@@ -17,12 +20,43 @@ def synthesize_entity_info(current_entity: EntityNode, new_info: ExtractedEntity
         
         Task: Write a new synthesized description, preserving historical information, adding new details, and removing duplicates.
     """).strip()
+
+def _synthesis_failed(e: Exception, response: str, current_entity: EntityNode) -> SynthesisError:
+    logger.debug("Synthesis failed for %s. Raw response: %.500s", current_entity.name, response)
+    err = SynthesisError(f"Merge error: {e}", response)
+    err.__cause__ = e
+    return err
+
+def synthesize_entity_info(current_entity: EntityNode, new_info: ExtractedEntity) -> SynthesisResult:
+    """Merge old and new information. Raises SynthesisError when the response cannot be parsed."""
+    
+    prompt = _synthesis_prompt(current_entity, new_info)
     
     response = ""
     try:
         response = generate_content(prompt, SynthesisResult)
         return SynthesisResult.model_validate_json(response)
     except Exception as e:
-        print(f"DEBUG: Synthesis Failed. Raw response: {response[:500]}")
-        st.error(f"Merge error: {e}")
-        return SynthesisResult(new_description=current_entity.description, new_keywords=current_entity.keywords)
+        raise _synthesis_failed(e, response, current_entity)
+
+async def _synthesize_async(aclient, semaphore: asyncio.Semaphore, current_entity: EntityNode, new_info: ExtractedEntity) -> Union[SynthesisResult, SynthesisError]:
+    prompt = _synthesis_prompt(current_entity, new_info)
+    
+    response = ""
+    try:
+        async with semaphore:
+            response = await generate_content_async(aclient, prompt, SynthesisResult)
+        return SynthesisResult.model_validate_json(response)
+    except Exception as e:
+        return _synthesis_failed(e, response, current_entity)
+
+def synthesize_entity_info_batch(pairs: List[Tuple[EntityNode, ExtractedEntity]], max_concurrency: int = 5) -> List[Union[SynthesisResult, SynthesisError]]:
+    """Run independent merge syntheses concurrently; results keep the order of `pairs` (a failed one is its SynthesisError)."""
+    async def _gather():
+        semaphore = asyncio.Semaphore(max_concurrency)
+        async with new_async_client() as aclient:
+            return await asyncio.gather(*[
+                _synthesize_async(aclient, semaphore, cur, new) for cur, new in pairs
+            ])
+
+    return asyncio.run(_gather())
@@ -0,0 +1,33 @@
+"""Bulk-ingest text files through the Gemini Batch API, outside the Streamlit UI.
+
+Usage: python ingest_offline.py notes.txt [more.txt ...]
+Each blank-line separated paragraph becomes one knowledge entry. Blocks until the batch job finishes.
+"""
+import argparse
+import logging
+from storage.sqlite_adapter import ingest_texts_offline
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract and store text files via the Gemini Batch API.")
+    parser.add_argument("files", nargs="+", help="UTF-8 text files; paragraphs are separated by blank lines")
+    parser.add_argument("--poll-seconds", type=int, default=30, help="How often to check the batch job")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+
+    texts = []
+    for path in args.files:
+        with open(path, encoding="utf-8") as f:
+            texts.extend(p.strip() for p in f.read().split("\n\n") if p.strip())
+    if not texts:
+        parser.error("no paragraphs found")
+
+    outcome = ingest_texts_offline(texts, poll_seconds=args.poll_seconds)
+    for i, err in enumerate(outcome):
+        if err is not None:
+            logging.error("Paragraph %d not saved: %s", i + 1, err)
+    saved = sum(err is None for err in outcome)
+    print(f"Saved {saved} of {len(texts)} paragraphs.")
+    return 0 if saved == len(texts) else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
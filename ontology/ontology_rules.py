@@ -1,23 +1,55 @@
+import re
 from typing import Callable, Tuple, List, Optional
 from extraction.models import ExtractedRelationship
 from ontology.relation_types import RelationshipType
 from ontology.schema import EntityNode
+from ontology.enums import EntityType, UsageContext
 
 class OntologyRule:
-    def __init__(self, id, description, check_fn):
+    def __init__(self, id, description, check_fn, machine_names=None, categories=None, deterministic=False, sql=None):
         self.id = id
         self.description = description
         self.check_fn = check_fn
+        # Dispatch scope: a rule can only fire for these relationship types (None = any)
+        self.machine_names = frozenset(machine_names) if machine_names else None
+        self.categories = frozenset(categories) if categories else None
+        self.deterministic = deterministic
+        # Optional SQL form of the violation predicate, for bulk re-checks (see violation_query)
+        self.sql = sql
         
     def evaluate(self, rel: ExtractedRelationship, rel_type: RelationshipType, src: EntityNode, tgt: EntityNode):
         return self.check_fn(rel, rel_type, src, tgt)
 
+    def applies_to(self, rel_type: RelationshipType) -> bool:
+        if self.machine_names is not None and rel_type.machine_name not in self.machine_names: return False
+        if self.categories is not None and rel_type.category not in self.categories: return False
+        if self.deterministic and not rel_type.deterministic: return False
+        return True
+
 # Lists to hold registered rules
 ONTOLOGY_CONSTRAINTS = []
 HEURISTIC_RULES = []
 EVIDENCE_RULES = []
 
-def register_rule(target_list):
+# (machine_name, category, deterministic) -> ((kind, rule), ...) across all three tiers
+_mask_cache = {}
+
+def applicable_rules(rel_type: RelationshipType) -> Tuple[Tuple[str, OntologyRule], ...]:
+    """Constraint mask for `rel_type`: every (kind, rule) that can fire, tiers in evaluation order.
+
+    Resolved once per distinct type signature.
+    """
+    key = (rel_type.machine_name, rel_type.category, bool(rel_type.deterministic))
+    mask = _mask_cache.get(key)
+    if mask is None:
+        mask = _mask_cache[key] = tuple(
+            (kind, r)
+            for kind, rules in (("Constraint", ONTOLOGY_CONSTRAINTS), ("Heuristic", HEURISTIC_RULES), ("Evidence", EVIDENCE_RULES))
+            for r in rules if r.applies_to(rel_type)
+        )
+    return mask
+
+def register_rule(target_list, machine_names=None, categories=None, deterministic=False, sql=None):
     def decorator(fn):
         # Infer ID from function name (e.g., r1_... -> R1)
         # If strict format r<number>_name, use R<number>. Else use full name.
@@ -32,35 +64,71 @@ def register_rule(target_list):
 
         description = fn.__doc__.strip() if fn.__doc__ else default_desc
         
-        target_list.append(OntologyRule(rule_id, description, fn))
+        target_list.append(OntologyRule(rule_id, description, fn, machine_names, categories, deterministic, sql))
+        _mask_cache.clear()
         return fn
     return decorator
 
-# Wrappers for specific lists
-def ontology_constraint(fn):
-    return register_rule(ONTOLOGY_CONSTRAINTS)(fn)
-
-def heuristic_rule(fn):
-    return register_rule(HEURISTIC_RULES)(fn)
-
-def evidence_rule(fn):
-    return register_rule(EVIDENCE_RULES)(fn)
+# Wrappers for specific lists; usable bare (@heuristic_rule) or scoped (@heuristic_rule(machine_names=[...]))
+def _list_decorator(target_list):
+    def wrapper(fn=None, **scope):
+        if fn is None:
+            return register_rule(target_list, **scope)
+        return register_rule(target_list)(fn)
+    return wrapper
+
+ontology_constraint = _list_decorator(ONTOLOGY_CONSTRAINTS)
+heuristic_rule = _list_decorator(HEURISTIC_RULES)
+evidence_rule = _list_decorator(EVIDENCE_RULES)
+
+def _sql_in(col: str, values, params: list) -> str:
+    # Values are bound, never spliced into the SQL text
+    values = sorted(values)
+    params.extend(values)
+    return f"{col} IN ({', '.join('?' * len(values))})"
+
+def violation_query(rules: List[OntologyRule]) -> Tuple[str, list]:
+    """(sql, params): one SELECT of relation_assertions ids that violate any rule carrying a `sql` predicate.
+
+    Aliases: ra = relation_assertions, rt = relationship_types, s / t = source / target entity
+    (with the loader's empty-type -> Concept default applied).
+    """
+    clauses, params = [], []
+    for r in rules:
+        if not r.sql: continue
+        scope = []
+        if r.machine_names is not None: scope.append(_sql_in("rt.machine_name", r.machine_names, params))
+        if r.categories is not None: scope.append(_sql_in("rt.category", r.categories, params))
+        if r.deterministic: scope.append("rt.deterministic = 1")
+        clauses.append("(" + " AND ".join(scope + [f"({r.sql})"]) + ")")
+    return f'''SELECT ra.id FROM relation_assertions ra
+               JOIN relationship_types rt ON rt.id = ra.relationship_type_id
+               JOIN (SELECT id, coalesce(nullif(type, ''), 'Concept') AS type FROM entities) s ON s.id = ra.source_entity_id
+               JOIN (SELECT id, coalesce(nullif(type, ''), 'Concept') AS type FROM entities) t ON t.id = ra.target_entity_id
+               WHERE {" OR ".join(clauses) or "0"}''', params
+
+# Entity types and usage contexts arrive as enum members (pydantic-validated), so rule bodies
+# compare by identity; machine_name / category are plain strings and keep == comparisons.
+CONCEPT = EntityType.CONCEPT
+PERSON = EntityType.PERSON
+AGENT_TYPES = frozenset({EntityType.PERSON, EntityType.ORGANIZATION})
 
 # --- HARD CONSTRAINTS ---
 
-@ontology_constraint
+@ontology_constraint(machine_names=["instance_of"], sql="t.type <> 'Concept'")
 def r1_instance_target_concept(rel, rt, s, t):
     """Instance_of target Concept"""
-    if rt.machine_name == "instance_of" and t.type != "Concept": return 0.0, "Target must be Concept"
+    if rt.machine_name == "instance_of" and t.type is not CONCEPT: return 0.0, "Target must be Concept"
     return 1.0, None
 
-@ontology_constraint
+@ontology_constraint(machine_names=["subclass_of"], sql="s.type <> 'Concept' OR t.type <> 'Concept'")
 def r2_subclass_concept(rel, rt, s, t):
     """Subclass_of requests Concept->Concept"""
-    if rt.machine_name == "subclass_of" and (s.type != "Concept" or t.type != "Concept"): return 0.0, "Requires Concept->Concept"
+    if rt.machine_name == "subclass_of" and (s.type is not CONCEPT or t.type is not CONCEPT): return 0.0, "Requires Concept->Concept"
     return 1.0, None
 
-@ontology_constraint
+@ontology_constraint(deterministic=True,
+                     sql="json_type(ra.semantic_properties, '$.probability') IN ('integer', 'real') AND json_extract(ra.semantic_properties, '$.probability') < 1.0")
 def r5_deterministic_prob(rel, rt, s, t):
     """Deterministic prob=1.0"""
     if rt.deterministic:
@@ -68,56 +136,59 @@ def r5_deterministic_prob(rel, rt, s, t):
         if isinstance(prob, (int, float)) and prob < 1.0: return 0.0, "Deterministic means prob 1.0"
     return 1.0, None
 
-@ontology_constraint
+@ontology_constraint(categories=["temporal"], sql="json_type(ra.semantic_properties, '$.temporal_lag') IS NULL")
 def r6_temporal_lag(rel, rt, s, t):
     """Temporal requires lag"""
     if rt.category == "temporal" and "temporal_lag" not in rel.semantic_properties: return 0.0, "Missing temporal_lag"
     return 1.0, None
 
-@ontology_constraint
+@ontology_constraint(deterministic=True, sql="ra.usage_context = 'hypothesis'")
 def r10_hypothesis_deterministic(rel, rt, s, t):
     """Hypothesis non-deterministic"""
     # Note: usage_context is now an Enum in ExtractedRelationship
-    if rel.usage_context.value == "hypothesis" and rt.deterministic: return 0.0, "Hypothesis cannot be deterministic"
+    if rel.usage_context is UsageContext.HYPOTHESIS and rt.deterministic: return 0.0, "Hypothesis cannot be deterministic"
     return 1.0, None
 
 # --- HEURISTIC RULES (Soft) ---
 
-@heuristic_rule
+# Cue lists compiled once into alternations: one regex pass over the span instead of one scan per cue
+def _any_of(phrases) -> re.Pattern:
+    return re.compile("|".join(map(re.escape, phrases)))
+
+IMPERATIVE_CUES = _any_of(["practice ", "do not ", "don't ", "try to ", "let us ", "you must ", "should "])
+TYPE_WORDS = _any_of(["is a", "belongs to", "type of", "kind of", "class of"])
+
+@heuristic_rule(categories=["causal"])
 def r3_causal_target_person(rel, rt, s, t):
     """Causal cannot target Person"""
-    if rt.category == "causal" and t.type == "Person": return 0.5, "Causal target Person (Heuristic)"
+    if rt.category == "causal" and t.type is PERSON: return 0.5, "Causal target Person (Heuristic)"
     return 1.0, None
 
-@heuristic_rule
+@heuristic_rule(machine_names=["causes", "teaches", "performs"])
 def r7_concept_act(rel, rt, s, t):
     """Concept cannot Act"""
-    if s.type == "Concept" and rt.machine_name in ["causes", "teaches", "performs"]: return 0.5, "Concept cannot Act (Heuristic)"
+    if s.type is CONCEPT and rt.machine_name in ("causes", "teaches", "performs"): return 0.5, "Concept cannot Act (Heuristic)"
     return 1.0, None
 
-@heuristic_rule
+@heuristic_rule(machine_names=["teaches"])
 def r8_teaches_agent(rel, rt, s, t):
     """Teaches requires Agent source"""
-    if rt.machine_name == "teaches" and s.type not in ["Person", "Organization"]: return 0.5, "Teacher must be Agent (Heuristic)"
+    if rt.machine_name == "teaches" and s.type not in AGENT_TYPES: return 0.5, "Teacher must be Agent (Heuristic)"
     return 1.0, None
 
-@heuristic_rule
+@heuristic_rule(machine_names=["performs"])
 def r4_imperative_evidence(rel, rt, s, t):
     """Imperative evidence vs performs"""
     # Detect imperative cues in English
-    span_lower = rel.evidence_span.lower()
-    imperative_cues = ["practice ", "do not ", "don't ", "try to ", "let us ", "you must ", "should "]
-    if rt.machine_name == "performs" and any(cue in span_lower for cue in imperative_cues):
+    if rt.machine_name == "performs" and IMPERATIVE_CUES.search(rel.evidence_lc):
         return 0.3, "Imperative/Advice evidence implies no factual 'performs'"
     return 1.0, None
 
-@heuristic_rule
+@heuristic_rule(machine_names=["is_a"])
 def r11_is_a_evidence_check(rel, rt, s, t):
     """Evidence must explicitly indicate type"""
     if rt.machine_name == "is_a":
-        evidence = (rel.evidence_span or "").lower()
-        type_words = ["is a", "belongs to", "type of", "kind of", "class of"]
-        if not any(w in evidence for w in type_words):
+        if not TYPE_WORDS.search(rel.evidence_lc):
             return 0.0, "Evidence does not support is_a"
     return 1.0, None
 
@@ -126,6 +197,6 @@ def r11_is_a_evidence_check(rel, rt, s, t):
 @evidence_rule
 def r9_evidence_names(rel, rt, s, t):
     """Evidence mentions entities"""
-    span = rel.evidence_span.lower()
-    if s.name.lower() not in span or t.name.lower() not in span: return 0.6, "Evidence missing entity names"
+    span = rel.evidence_lc
+    if s.name_lc not in span or t.name_lc not in span: return 0.6, "Evidence missing entity names"
     return 1.0, None
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
+from functools import cached_property
 
 class RelationshipType(BaseModel):
     id: Optional[str] = None
@@ -12,3 +13,18 @@ class RelationshipType(BaseModel):
     properties_schema: Optional[Dict[str, dict]] = None
     version: str = "1.0"
     deprecated: bool = False
+
+    @cached_property
+    def allowed_sets(self) -> Optional[Tuple[frozenset, frozenset]]:
+        # (source, target) as hash sets for the per-relation type check; None = unconstrained.
+        # Types are rebuilt on every registry reload, so the cache never outlives its data.
+        if not self.allowed_entity_types: return None
+        return (frozenset(self.allowed_entity_types.get("source", ())),
+                frozenset(self.allowed_entity_types.get("target", ())))
+
+    @cached_property
+    def property_checks(self) -> Tuple[Tuple[str, Optional[tuple]], ...]:
+        # (required key, allowed values or None) per properties_schema entry; enum values stay a tuple
+        # (not a set) because JSON property values may be unhashable lists/dicts
+        return tuple((key, tuple(schema.get("values", [])) if schema.get("type") == "enum" else None)
+                     for key, schema in (self.properties_schema or {}).items())
@@ -0,0 +1,7 @@
+import orjson
+
+# orjson parses/serializes in native code; SQLite columns stay TEXT, hence the decode.
+def dumps_json(obj) -> str:
+    return orjson.dumps(obj).decode()
+
+loads_json = orjson.loads
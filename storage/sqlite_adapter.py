@@ -1,177 +1,425 @@
+import logging
+import os
 import sqlite3
-import json
-import uuid
+import threading
 import streamlit as st
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pydantic import TypeAdapter
 from datetime import datetime
-from typing import List
+from itertools import islice
+from typing import Callable, Dict, List, Optional
 
-from ontology.schema import EntityNode, KnowledgeEntry, Evidence, RelationAssertion
+from storage.serialization import dumps_json, loads_json
+from ontology.schema import EntityNode, KnowledgeEntry, Evidence, RelationAssertion, generate_id
 from ontology.relation_types import RelationshipType
 from ontology.enums import EntityType
-from extraction.extractor import extract_data
-from extraction.synthesis import synthesize_entity_info
+from extraction.extractor import extract_data, extract_data_batch, extract_data_marshaled, format_type_constraints
+from extraction.batch_extractor import extract_data_batch_offline
+from extraction.synthesis import synthesize_entity_info, synthesize_entity_info_batch
 from extraction.similarity import normalize_entity_name
-from extraction.models import SynthesisResult
-from validation.relation_validator import validate_extracted_relationship
-from validation.ontology_confidence import calculate_ontology_confidence
+from extraction.models import SynthesisResult, ExtractionResult, ExtractedEntity
+from extraction.errors import ExtractionError
+from validation.relation_validator import validate_extracted_relationship, score_relation
+from ontology.ontology_rules import ONTOLOGY_CONSTRAINTS, violation_query
+
+logger = logging.getLogger(__name__)
 
 DB_PATH = "knowledge_base.db"
+# Page cache per connection in KiB (default 256 MiB keeps the whole KG resident).
+SQLITE_CACHE_KIB = int(os.getenv("BRAINOS_SQLITE_CACHE_KIB", "262144"))
+
+def entity_search_text(name: str, keywords: List[str]) -> str:
+    """Denormalised haystack for the entity search box: lower-cased name and keywords, one per line.
+
+    A single-line query can only match inside one of them, i.e. exactly when it is a substring of the
+    name or of some keyword.
+    """
+    return "\n".join([name, *keywords]).lower()
+
+@st.cache_resource(show_spinner=False)
+def _shared_db():
+    """One connection (+ its write lock) per server process, kept across reruns, sessions and
+    module reloads, so the WAL page cache and statement cache stay warm."""
+    # Autocommit: the driver never opens implicit transactions; writes go through transaction()
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None, cached_statements=256)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_KIB}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")
+    # Planner statistics: sampled (bounded) analysis, refreshed at open only where they are missing or stale
+    conn.execute("PRAGMA analysis_limit=400")
+    conn.execute("PRAGMA optimize=0x10002")
+    # Script threads of different sessions share the connection; one transaction at a time
+    return conn, threading.RLock()
+
+def optimize_db():
+    """Refresh planner statistics after a schema-level change.
+
+    PRAGMA optimize only re-analyzes tables whose statistics have drifted, sampling at most
+    analysis_limit rows per index, so it holds the connection lock briefly instead of a full ANALYZE scan.
+    """
+    conn, lock = _shared_db()
+    with lock:
+        conn.execute("PRAGMA optimize")
+
+@contextmanager
+def transaction():
+    """BEGIN IMMEDIATE ... COMMIT on the shared connection (one WAL commit per unit of work); ROLLBACK on error.
+
+    IMMEDIATE takes the write lock up front, so a unit of work that reads before it writes
+    cannot fail half-way with SQLITE_BUSY when another process holds the database.
+    """
+    conn, lock = _shared_db()
+    with lock:
+        conn.execute("BEGIN IMMEDIATE")
+        changes = conn.total_changes
+        try:
+            yield conn
+            # Commits that changed rows advance the persisted data version (see schema_version)
+            if conn.total_changes != changes:
+                conn.execute("UPDATE kb_version SET version = version + 1")
+            conn.execute("COMMIT")
+        except BaseException:
+            # Also on a failed COMMIT (busy, disk full): the shared connection must never stay mid-transaction
+            if conn.in_transaction: conn.execute("ROLLBACK")
+            raise
+
+@contextmanager
+def reading():
+    """The shared connection for a read-only unit of work.
+
+    Takes the same lock as transaction(), so a reader never runs inside another session's open
+    transaction and never sees (or caches) rows that are later rolled back. Reentrant per thread.
+    """
+    conn, lock = _shared_db()
+    with lock:
+        yield conn
+
+def schema_version() -> int:
+    """Data version of the database file: advanced by every transaction() that changes rows.
+
+    It lives in the file, not the module, so it survives module reloads and sees commits made by
+    other processes; the cross-session caches below are keyed by it.
+    """
+    with reading() as conn:
+        return conn.execute("SELECT version FROM kb_version").fetchone()[0]
 
 def init_session_state():
     if "entities" not in st.session_state: st.session_state.entities = {}
-    if "knowledges" not in st.session_state: st.session_state.knowledges = []
     if "relationship_types" not in st.session_state: st.session_state.relationship_types = {}
     if "evidence" not in st.session_state: st.session_state.evidence = {}
-    if "relation_assertions" not in st.session_state: st.session_state.relation_assertions = []
+    # id -> RelationAssertion, plus buckets keyed by type id and by (source or target) entity id
+    if "relation_assertions" not in st.session_state: st.session_state.relation_assertions = {}
+    if "relations_by_type" not in st.session_state: st.session_state.relations_by_type = {}
+    if "relations_by_entity" not in st.session_state: st.session_state.relations_by_entity = {}
+    if "rel_types_by_mname" not in st.session_state: st.session_state.rel_types_by_mname = {}
+
+def _reindex_relationship_types():
+    """machine_name -> active RelationshipType; rebuilt whenever the type registry changes."""
+    st.session_state.rel_types_by_mname = {rt.machine_name: rt for rt in st.session_state.relationship_types.values() if not rt.deprecated}
+    # Invalidates per-session strings derived from the registry (e.g. the extraction type constraints)
+    st.session_state.rel_types_version = st.session_state.get("rel_types_version", 0) + 1
+
+def _index_relations(relations):
+    by_type = st.session_state.relations_by_type
+    by_entity = st.session_state.relations_by_entity
+    for ra in relations:
+        st.session_state.relation_assertions[ra.id] = ra
+        by_type.setdefault(ra.relationship_type_id, {})[ra.id] = ra
+        by_entity.setdefault(ra.source_entity_id, {})[ra.id] = ra
+        by_entity.setdefault(ra.target_entity_id, {})[ra.id] = ra
+
+# Bump when init_db gains a migration; warm starts with an up-to-date file skip init_db's DDL entirely
+SCHEMA_VERSION = 4
+
+def _user_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
 
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS entities
-                 (id TEXT PRIMARY KEY, name TEXT, description TEXT, keywords TEXT, source_knowledge_ids TEXT)''')
+    # Runs on every rerun: an up-to-date file costs one PRAGMA read, not a write lock
+    with reading() as conn:
+        if _user_version(conn) >= SCHEMA_VERSION:
+            return
+    with transaction() as conn:
+        c = conn.cursor()
+        # Another session or process may have migrated between the check and the write lock
+        if _user_version(conn) >= SCHEMA_VERSION:
+            return
+
+        c.execute('''CREATE TABLE IF NOT EXISTS entities
+                     (id TEXT PRIMARY KEY, name TEXT, description TEXT, keywords TEXT, source_knowledge_ids TEXT)''')
     
-    # Entitiy Migrations
-    cols = [
-        ("type", "TEXT"), ("confidence", "REAL"),
-        ("doctrinal_context", "TEXT"), ("goals", "TEXT"), ("non_goals", "TEXT")
-    ]
-    for col, dtype in cols:
-        try: c.execute(f"ALTER TABLE entities ADD COLUMN {col} {dtype}")
-        except: pass
+        # Entitiy Migrations
+        cols = [
+            ("type", "TEXT"), ("confidence", "REAL"),
+            ("doctrinal_context", "TEXT"), ("goals", "TEXT"), ("non_goals", "TEXT")
+        ]
+        for col, dtype in cols:
+            try: c.execute(f"ALTER TABLE entities ADD COLUMN {col} {dtype}")
+            except: pass
 
-    c.execute('''CREATE TABLE IF NOT EXISTS knowledge
-                 (id TEXT PRIMARY KEY, content_raw TEXT, timestamp TEXT, related_entity_ids TEXT)''')
+        c.execute('''CREATE TABLE IF NOT EXISTS knowledge
+                     (id TEXT PRIMARY KEY, content_raw TEXT, timestamp TEXT, related_entity_ids TEXT)''')
 
-    c.execute('''CREATE TABLE IF NOT EXISTS evidence
-                 (id TEXT PRIMARY KEY, source_knowledge_id TEXT, text_span TEXT)''')
+        c.execute('''CREATE TABLE IF NOT EXISTS evidence
+                     (id TEXT PRIMARY KEY, source_knowledge_id TEXT, text_span TEXT)''')
                  
-    c.execute('''CREATE TABLE IF NOT EXISTS relationship_types
-                 (id TEXT PRIMARY KEY, machine_name TEXT, description TEXT, category TEXT, 
-                  directional INTEGER, deterministic INTEGER, allowed_entity_types TEXT, properties_schema TEXT,
-                  version TEXT, deprecated INTEGER)''')
+        c.execute('''CREATE TABLE IF NOT EXISTS relationship_types
+                     (id TEXT PRIMARY KEY, machine_name TEXT, description TEXT, category TEXT, 
+                      directional INTEGER, deterministic INTEGER, allowed_entity_types TEXT, properties_schema TEXT,
+                      version TEXT, deprecated INTEGER)''')
 
-    # Rename old table if exists
-    try:
-        c.execute("ALTER TABLE relationship_instances RENAME TO relation_assertions")
-    except: pass
-
-    c.execute('''CREATE TABLE IF NOT EXISTS relation_assertions 
-                 (id TEXT PRIMARY KEY, knowledge_id TEXT, relationship_type_id TEXT, 
-                  source_entity_id TEXT, target_entity_id TEXT, usage_context TEXT, 
-                  semantic_properties TEXT, evidence_ids TEXT, extraction_confidence REAL, 
-                  system_confidence REAL, status TEXT, created_at TEXT)''')
-
-    # Relation Migrations
-    r_cols = [("ontology_confidence", "REAL"), ("axis", "TEXT"), ("polarity", "TEXT")]
-    for col, dtype in r_cols:
-        try: c.execute(f"ALTER TABLE relation_assertions ADD COLUMN {col} {dtype}")
+        # Rename old table if exists
+        try:
+            c.execute("ALTER TABLE relationship_instances RENAME TO relation_assertions")
         except: pass
 
-    # Seed Default Relationships
-    c.execute("SELECT count(*) FROM relationship_types")
-    if c.fetchone()[0] == 0:
-        defaults = [
-            ("is_a", "Hierarchical classification (A is a type of B)", "hierarchical"),
-            ("part_of", "Compositional relationship (A is part of B)", "hierarchical"),
-            ("causes", "Causal link (A causes B)", "causal"),
-            ("associated_with", "General correlation or association", "associative"),
-            ("teaches", "Didactic component", "social"),
-            ("performs", "Action execution", "action"),
-            ("instance_of", "Specific instance of a concept", "hierarchical"),
-            ("subclass_of", "Specific subclass of a concept", "hierarchical"),
-        ]
-        for name, desc, cat in defaults:
-            rid = str(uuid.uuid4())
-            c.execute("INSERT INTO relationship_types (id, machine_name, description, category, directional, deterministic) VALUES (?, ?, ?, ?, 1, 0)", 
-                      (rid, name, desc, cat))
-    
-    conn.commit()
-    conn.close()
+        c.execute('''CREATE TABLE IF NOT EXISTS relation_assertions 
+                     (id TEXT PRIMARY KEY, knowledge_id TEXT, relationship_type_id TEXT, 
+                      source_entity_id TEXT, target_entity_id TEXT, usage_context TEXT, 
+                      semantic_properties TEXT, evidence_ids TEXT, extraction_confidence REAL, 
+                      system_confidence REAL, status TEXT, created_at TEXT)''')
 
-def load_data_from_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    
-    # 0. Load Evidence
-    c.execute("SELECT * FROM evidence")
-    st.session_state.evidence = {row['id']: row['text_span'] for row in c.fetchall()}
+        # Relation Migrations
+        r_cols = [("ontology_confidence", "REAL"), ("axis", "TEXT"), ("polarity", "TEXT")]
+        for col, dtype in r_cols:
+            try: c.execute(f"ALTER TABLE relation_assertions ADD COLUMN {col} {dtype}")
+            except: pass
 
-    # 1. Load Types
-    c.execute("SELECT * FROM relationship_types")
+        # v2: search haystack (see entity_search_text), kept in step by every entity write
+        try: c.execute("ALTER TABLE entities ADD COLUMN search_text TEXT")
+        except: pass
+        c.executemany("UPDATE entities SET search_text = ? WHERE id = ?",
+                      [(entity_search_text(name, loads_json(keywords) if keywords else []), eid)
+                       for eid, name, keywords in c.execute("SELECT id, name, keywords FROM entities WHERE search_text IS NULL").fetchall()])
+
+        # v3: persisted data version keying the load caches, advanced by transaction()
+        c.execute("CREATE TABLE IF NOT EXISTS kb_version (id INTEGER PRIMARY KEY CHECK (id = 0), version INTEGER NOT NULL)")
+        c.execute("INSERT OR IGNORE INTO kb_version VALUES (0, 0)")
+
+        # v4: legacy rows without a type are Concepts (as the loader always read them), stored as such
+        # so the type filter can match them with a plain indexed `type = ?`
+        c.execute("UPDATE entities SET type = 'Concept' WHERE type IS NULL OR type = ''")
+
+        # Graph-traversal indexes (merge, delete-by-type, per-knowledge lookups)
+        c.execute("CREATE INDEX IF NOT EXISTS idx_rel_src ON relation_assertions(source_entity_id, relationship_type_id)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_rel_tgt ON relation_assertions(target_entity_id, relationship_type_id)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_rel_type ON relation_assertions(relationship_type_id)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_rel_knowledge ON relation_assertions(knowledge_id)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_evidence_knowledge ON evidence(source_knowledge_id)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_entities_type_name ON entities(type, name)")
+
+        # Seed Default Relationships
+        c.execute("SELECT count(*) FROM relationship_types")
+        if c.fetchone()[0] == 0:
+            defaults = [
+                ("is_a", "Hierarchical classification (A is a type of B)", "hierarchical"),
+                ("part_of", "Compositional relationship (A is part of B)", "hierarchical"),
+                ("causes", "Causal link (A causes B)", "causal"),
+                ("associated_with", "General correlation or association", "associative"),
+                ("teaches", "Didactic component", "social"),
+                ("performs", "Action execution", "action"),
+                ("instance_of", "Specific instance of a concept", "hierarchical"),
+                ("subclass_of", "Specific subclass of a concept", "hierarchical"),
+            ]
+            for name, desc, cat in defaults:
+                rid = generate_id()
+                c.execute("INSERT INTO relationship_types (id, machine_name, description, category, directional, deterministic) VALUES (?, ?, ?, ?, 1, 0)", 
+                          (rid, name, desc, cat))
+
+        c.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+# Explicit projections: init_db() guarantees every migrated column exists, so rows need no key checks
+ENTITY_COLUMNS = "id, name, type, description, keywords, source_knowledge_ids, doctrinal_context, goals, non_goals"
+RELATION_COLUMNS = ("id, knowledge_id, relationship_type_id, source_entity_id, target_entity_id, usage_context, semantic_properties, "
+                    "evidence_ids, extraction_confidence, ontology_confidence, system_confidence, status, created_at, axis, polarity")
+# Full load: SQLite renders each entity as a JSON object (JSON columns inlined via json()), and
+# pydantic-core parses and validates a chunk of them per call; no per-row json.loads or constructor.
+_ENTITY_LIST = TypeAdapter(List[EntityNode])
+LOAD_CHUNK = 1000
+ENTITIES_AS_JSON = '''SELECT json_object(
+    'id', id, 'name', name, 'type', coalesce(nullif(type, ''), 'Concept'), 'description', description,
+    'keywords', json(keywords), 'source_knowledge_ids', json(source_knowledge_ids), 'doctrinal_context', doctrinal_context,
+    'goals', json(coalesce(nullif(goals, ''), '[]')), 'non_goals', json(coalesce(nullif(non_goals, ''), '[]'))
+) FROM entities'''
+
+KNOWLEDGE_COLUMNS = "id, content_raw, timestamp, related_entity_ids"
+RELATION_TYPE_COLUMNS = "id, machine_name, description, category, directional, deterministic, allowed_entity_types, properties_schema, version, deprecated"
+
+# Row mappers unpack positionally in the column order of the projections above (no name lookups)
+def _row_to_entity(row) -> EntityNode:
+    id_, name, type_, description, keywords, source_ids, doctrinal_context, goals, non_goals = row[:9]
+    return EntityNode(
+        id=id_, name=name, 
+        type=type_ if type_ else EntityType.CONCEPT,
+        description=description, keywords=loads_json(keywords),
+        source_knowledge_ids=loads_json(source_ids),
+        doctrinal_context=doctrinal_context,
+        # Handle JSON fields
+        goals=loads_json(goals) if goals else [],
+        non_goals=loads_json(non_goals) if non_goals else []
+    )
+
+def _row_to_relation(row) -> RelationAssertion:
+    (id_, knowledge_id, type_id, source_id, target_id, usage_context, semantic_properties, evidence_ids,
+     extraction_conf, oc, system_conf, status, created_at, axis, polarity) = row[:15]
+    return RelationAssertion(
+        id=id_, knowledge_id=knowledge_id, relationship_type_id=type_id,
+        source_entity_id=source_id, target_entity_id=target_id,
+        usage_context=usage_context, 
+        semantic_properties=loads_json(semantic_properties),
+        evidence_ids=loads_json(evidence_ids) if evidence_ids else [],
+        extraction_confidence=extraction_conf, ontology_confidence=oc if oc is not None else 1.0,
+        system_confidence=system_conf, status=status,
+        created_at=created_at, axis=axis, polarity=polarity
+    )
+
+def _row_to_knowledge(row) -> KnowledgeEntry:
+    kid, content_raw, timestamp, related_ids = row[:4]
+    return KnowledgeEntry(
+        id=kid, content_raw=content_raw, 
+        timestamp=datetime.fromisoformat(timestamp),
+        related_entity_ids=loads_json(related_ids)
+    )
+
+def _read_relationship_types(c) -> Dict[str, RelationshipType]:
     r_types = {}
-    for row in c.fetchall():
-        try:allowed = json.loads(row['allowed_entity_types']) if row['allowed_entity_types'] else None
+    for (rid, machine_name, description, category, directional, deterministic,
+         allowed_raw, props_raw, version, deprecated) in c.execute(f"SELECT {RELATION_TYPE_COLUMNS} FROM relationship_types"):
+        try:allowed = loads_json(allowed_raw) if allowed_raw else None
         except: allowed = None
-        try: props = json.loads(row['properties_schema']) if row['properties_schema'] else None
+        try: props = loads_json(props_raw) if props_raw else None
         except: props = None
         
         rt = RelationshipType(
-            id=row['id'], machine_name=row['machine_name'], description=row['description'],
-            category=row['category'] if row['category'] else "General",
-            directional=bool(row['directional']), deterministic=bool(row['deterministic']),
+            id=rid, machine_name=machine_name, description=description,
+            category=category if category else "General",
+            directional=bool(directional), deterministic=bool(deterministic),
             allowed_entity_types=allowed, properties_schema=props,
-            version=row['version'] if 'version' in row.keys() and row['version'] else "1.0",
-            deprecated=bool(row['deprecated']) if 'deprecated' in row.keys() and row['deprecated'] else False
+            version=version if version else "1.0",
+            deprecated=bool(deprecated)
         )
-        r_types[row['id']] = rt
-    st.session_state.relationship_types = r_types
+        r_types[rid] = rt
+    return r_types
+
+def load_relationship_types() -> Dict[str, RelationshipType]:
+    """id -> RelationshipType straight from the database, for code running outside a session."""
+    with reading() as conn:
+        return _read_relationship_types(conn.cursor())
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _load_all(db_path: str, schema_version: int):
+    """Read the whole KB once per (db file, data version); shared by all sessions.
+
+    db_path only keys the cache; reads go through the shared connection.
+    """
+    with reading() as conn:
+        return _read_all(conn.cursor())
+
+def _read_all(c):
+    # 0. Load Evidence (cursor iterated directly: no intermediate fetchall() lists)
+    evidence = dict(c.execute("SELECT id, text_span FROM evidence"))
+
+    # 1. Load Types
+    r_types = _read_relationship_types(c)
 
     # 2. Load Entities
-    c.execute("SELECT * FROM entities")
+    # Chunked so only LOAD_CHUNK rows of raw JSON are alive at once, not one blob of the whole table
     entities = {}
-    for row in c.fetchall():
-        # Handle JSON fields
-        goals = json.loads(row['goals']) if 'goals' in row.keys() and row['goals'] else []
-        non_goals = json.loads(row['non_goals']) if 'non_goals' in row.keys() and row['non_goals'] else []
-        
-        ent = EntityNode(
-            id=row['id'], name=row['name'], 
-            type=row['type'] if row['type'] else EntityType.CONCEPT,
-            description=row['description'], keywords=json.loads(row['keywords']),
-            source_knowledge_ids=json.loads(row['source_knowledge_ids']),
-            doctrinal_context=row['doctrinal_context'] if 'doctrinal_context' in row.keys() else None,
-            goals=goals, non_goals=non_goals
-        )
-        entities[row['id']] = ent
-    st.session_state.entities = entities
+    rows = c.execute(ENTITIES_AS_JSON)
+    while chunk := [r[0] for r in islice(rows, LOAD_CHUNK)]:
+        entities.update((e.id, e) for e in _ENTITY_LIST.validate_json("[" + ",".join(chunk) + "]"))
 
-    # 3. Load Knowledge
-    c.execute("SELECT * FROM knowledge")
-    knowledges = []
-    for row in c.fetchall():
-        k = KnowledgeEntry(
-            id=row['id'], content_raw=row['content_raw'], 
-            timestamp=datetime.fromisoformat(row['timestamp']),
-            related_entity_ids=json.loads(row['related_entity_ids'])
-        )
-        knowledges.append(k)
-    st.session_state.knowledges = knowledges
-    
-    # 4. Load Relations
-    c.execute("SELECT * FROM relation_assertions")
-    # Need to verify if table is correct (migration happened in init_db)
-    relations = []
-    for row in c.fetchall():
-        ev_ids = json.loads(row['evidence_ids']) if row['evidence_ids'] else []
-        oc = row['ontology_confidence'] if 'ontology_confidence' in row.keys() and row['ontology_confidence'] is not None else 1.0
-        axis = row['axis'] if 'axis' in row.keys() else None
-        polarity = row['polarity'] if 'polarity' in row.keys() else None
-
-        ri = RelationAssertion(
-            id=row['id'], knowledge_id=row['knowledge_id'], relationship_type_id=row['relationship_type_id'],
-            source_entity_id=row['source_entity_id'], target_entity_id=row['target_entity_id'],
-            usage_context=row['usage_context'], 
-            semantic_properties=json.loads(row['semantic_properties']),
-            evidence_ids=ev_ids,
-            extraction_confidence=row['extraction_confidence'], ontology_confidence=oc,
-            system_confidence=row['system_confidence'], status=row['status'],
-            created_at=row['created_at'], axis=axis, polarity=polarity
-        )
-        relations.append(ri)
-    st.session_state.relation_assertions = relations
+    # 3. Load Relations
+    relations = [_row_to_relation(row) for row in c.execute(f"SELECT {RELATION_COLUMNS} FROM relation_assertions")]
     
-    conn.close()
+    return evidence, r_types, entities, relations
+
+def load_data_from_db():
+    evidence, r_types, entities, relations = _load_all(DB_PATH, schema_version())
+    st.session_state.evidence = evidence
+    st.session_state.relationship_types = r_types
+    st.session_state.entities = entities
+    st.session_state.relation_assertions = {}
+    st.session_state.relations_by_type = {}
+    st.session_state.relations_by_entity = {}
+    _index_relations(relations)
+    _reindex_relationship_types()
+
+# Page queries: the window COUNT(*) OVER() returns the filtered total on every row,
+# so one round trip yields both the page and the pager size.
+def fetch_entity_page(offset: int, limit: int, search: str = None, type_filter: str = None):
+    """Return (total, [EntityNode]) for one page of entities ordered by name."""
+    with reading() as conn:
+        rows = conn.execute(f'''SELECT {ENTITY_COLUMNS}, COUNT(*) OVER() AS total FROM entities
+                               WHERE (?1 IS NULL OR type = ?1)
+                                 AND (?2 IS NULL OR instr(search_text, ?2) > 0)
+                               ORDER BY name LIMIT ?3 OFFSET ?4''',
+                            (type_filter, search.lower() if search else None, limit, offset)).fetchall()
+    total = rows[0][-1] if rows else 0
+    return total, [_row_to_entity(row) for row in rows]
+
+def fetch_knowledge_page(offset: int, limit: int):
+    """Return (total, [KnowledgeEntry]) for one page of knowledge entries, newest first."""
+    with reading() as conn:
+        rows = conn.execute(f'''SELECT {KNOWLEDGE_COLUMNS}, COUNT(*) OVER() AS total FROM knowledge
+                               ORDER BY rowid DESC LIMIT ? OFFSET ?''', (limit, offset)).fetchall()
+    total = rows[0][-1] if rows else 0
+    return total, [_row_to_knowledge(row) for row in rows]
+
+def fetch_relation_page(offset: int, limit: int, type_names: List[str] = None):
+    """Return (total, [RelationAssertion]) for one page of assertions in insertion order.
+
+    `type_names` filters by machine name, resolved against relationship_types in the same query (the source
+    relation_type_options() reads), so a selection that no longer names a type yields an empty page.
+    """
+    where, params = "", []
+    if type_names:
+        where = f"""WHERE relationship_type_id IN
+                    (SELECT id FROM relationship_types WHERE machine_name IN ({','.join('?' * len(type_names))}))"""
+        params = list(type_names)
+    with reading() as conn:
+        rows = conn.execute(f'''SELECT {RELATION_COLUMNS}, COUNT(*) OVER() AS total FROM relation_assertions {where}
+                               ORDER BY rowid LIMIT ? OFFSET ?''', params + [limit, offset]).fetchall()
+    total = rows[0][-1] if rows else 0
+    return total, [_row_to_relation(row) for row in rows]
+
+def fetch_evidence_page(after_rowid: int, limit: int):
+    """Return [(rowid, id, source_knowledge_id, text_span)] for the `limit` evidence rows after `after_rowid`.
+
+    Keyset pagination: evidence is append-only, and a rowid seek costs the same on every page, where OFFSET
+    would step over all earlier rows.
+    """
+    with reading() as conn:
+        return conn.execute("SELECT rowid, id, source_knowledge_id, text_span FROM evidence WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                            (after_rowid, limit)).fetchall()
+
+def fetch_relations_by_knowledge(knowledge_ids: List[str]) -> dict:
+    """knowledge_id -> [RelationAssertion] for the given entries, in one query over idx_rel_knowledge."""
+    by_knowledge = {}
+    if not knowledge_ids: return by_knowledge
+    with reading() as conn:
+        rows = conn.execute(f'''SELECT {RELATION_COLUMNS} FROM relation_assertions
+                               WHERE knowledge_id IN ({','.join('?' * len(knowledge_ids))}) ORDER BY rowid''', knowledge_ids).fetchall()
+    for row in rows:
+        ra = _row_to_relation(row)
+        by_knowledge.setdefault(ra.knowledge_id, []).append(ra)
+    return by_knowledge
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _relation_type_options(db_path: str, schema_version: int) -> tuple:
+    # One EXISTS probe per type on idx_rel_type instead of a DISTINCT pass over every assertion
+    with reading() as conn:
+        return tuple(r[0] for r in conn.execute(
+            """SELECT machine_name FROM relationship_types rt
+               WHERE EXISTS (SELECT 1 FROM relation_assertions WHERE relationship_type_id = rt.id)
+               ORDER BY machine_name"""))
+
+def relation_type_options() -> tuple:
+    """Sorted machine names of the types that have assertions; recomputed only after a write."""
+    return _relation_type_options(DB_PATH, schema_version())
 
 def create_relationship_type(machine_name, description):
     # Check if exists
@@ -180,273 +428,401 @@ def create_relationship_type(machine_name, description):
             st.warning(f"Type '{machine_name}' already exists.")
             return
 
-    new_id = str(uuid.uuid4())
+    new_id = generate_id()
     rt = RelationshipType(id=new_id, machine_name=machine_name, description=description, category="General")
     
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('''INSERT INTO relationship_types (id, machine_name, description, category, directional, deterministic) 
-                 VALUES (?, ?, ?, ?, ?, ?)''', 
-              (new_id, machine_name, description, "General", 1, 0))
-    conn.commit()
-    conn.close()
+    # Even single writes take the lock, so they never land inside another session's open transaction
+    with transaction() as conn:
+        conn.execute('''INSERT INTO relationship_types (id, machine_name, description, category, directional, deterministic) 
+                        VALUES (?, ?, ?, ?, ?, ?)''', 
+                     (new_id, machine_name, description, "General", 1, 0))
     
     st.session_state.relationship_types[new_id] = rt
+    _reindex_relationship_types()
     st.success(f"Created relationship type: {machine_name}")
 
 def update_relationship_type(id, description):
     if id in st.session_state.relationship_types:
         st.session_state.relationship_types[id].description = description
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("UPDATE relationship_types SET description = ? WHERE id = ?", (description, id))
-        conn.commit()
-        conn.close()
+        with transaction() as conn:
+            conn.execute("UPDATE relationship_types SET description = ? WHERE id = ?", (description, id))
+        # Descriptions feed the extraction type constraints, so they count as a registry change
+        _reindex_relationship_types()
         st.success("Updated!")
 
 def delete_relationship_type(type_id):
     if type_id in st.session_state.relationship_types:
         del st.session_state.relationship_types[type_id]
+        _reindex_relationship_types()
         
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("DELETE FROM relationship_types WHERE id = ?", (type_id,))
-        # Delete dependencies
-        c.execute("DELETE FROM relation_assertions WHERE relationship_type_id = ?", (type_id,))
-        conn.commit()
-        conn.close()
+        with transaction() as conn:
+            conn.execute("DELETE FROM relationship_types WHERE id = ?", (type_id,))
+            # Delete dependencies
+            conn.execute("DELETE FROM relation_assertions WHERE relationship_type_id = ?", (type_id,))
         
-        # Update session state relations
-        st.session_state.relation_assertions = [u for u in st.session_state.relation_assertions if u.relationship_type_id != type_id]
+        # Update session state relations: drop the type's bucket instead of filtering every assertion
+        by_entity = st.session_state.relations_by_entity
+        for ra_id, ra in st.session_state.relations_by_type.pop(type_id, {}).items():
+            del st.session_state.relation_assertions[ra_id]
+            by_entity.get(ra.source_entity_id, {}).pop(ra_id, None)
+            by_entity.get(ra.target_entity_id, {}).pop(ra_id, None)
         st.success("Deleted type and associated instances.")
 
+def import_relationship_types(conn, types: List[dict]) -> int:
+    """Upsert relationship types from an ontology file; returns how many new (name, version) rows were added.
+
+    A type matching an existing (machine_name, version) is updated in place; a new version deprecates every
+    older row of that name and is inserted. Existing rows come back in one query, the file is resolved in
+    memory (later entries see earlier ones) and the writes go out as three executemany batches.
+    Run it inside the caller's transaction().
+    """
+    names = list({rt['machine_name'] for rt in types})
+    by_name = {}  # machine_name -> [(id, version)], including rows added by this import
+    # version always exists after init_db() migrations; NULL means the 1.0 default
+    for rid, machine_name, version in conn.execute(
+            "SELECT id, machine_name, coalesce(nullif(version, ''), '1.0') FROM relationship_types "
+            f"WHERE machine_name IN ({','.join('?' * len(names))})", names):
+        by_name.setdefault(machine_name, []).append((rid, version))
+
+    updates = {}        # existing id -> [columns..., deprecated]; the last entry in the file wins
+    deprecated = set()  # existing ids retired by a newer version
+    inserts = {}        # new id -> [id, machine_name, columns..., version, deprecated]
+    count = 0
+    for rt in types:
+        machine_name = rt['machine_name']
+        target_ver = rt.get('version', "1.0")
+        cols = [rt['description'], rt.get('category'), rt.get('directional', True), rt.get('deterministic', False),
+                dumps_json(rt.get('allowed_entity_types', {})), dumps_json(rt.get('properties_schema', {}))]
+        rows = by_name.setdefault(machine_name, [])
+        existing_match = next((rid for rid, r_ver in rows if r_ver == target_ver), None)
+
+        if existing_match in inserts:
+            inserts[existing_match][2:] = [*cols, target_ver, rt.get('deprecated', False)]
+        elif existing_match:
+            updates[existing_match] = [*cols, rt.get('deprecated', False)]
+            deprecated.discard(existing_match)
+        else:
+            # Deprecate old
+            for rid, _ in rows:
+                if rid in inserts: inserts[rid][-1] = True
+                elif rid in updates: updates[rid][-1] = True
+                else: deprecated.add(rid)
+            new_id = generate_id()
+            inserts[new_id] = [new_id, machine_name, *cols, target_ver, rt.get('deprecated', False)]
+            rows.append((new_id, target_ver))
+            count += 1
+
+    conn.executemany("UPDATE relationship_types SET deprecated=1 WHERE id=?", [(rid,) for rid in deprecated])
+    conn.executemany('''UPDATE relationship_types
+                        SET description=?, category=?, directional=?, deterministic=?, allowed_entity_types=?, properties_schema=?, deprecated=?
+                        WHERE id=?''', [(*vals, rid) for rid, vals in updates.items()])
+    conn.executemany('''INSERT INTO relationship_types
+                        (id, machine_name, description, category, directional, deterministic, allowed_entity_types, properties_schema, version, deprecated)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', list(inserts.values()))
+    return count
+
+def flag_ontology_violations(conn) -> int:
+    """Re-check every stored assertion against the SQL-expressible hard constraints in one statement.
+
+    Used after schema edits; violators get status 'ontology_violation'. Run it inside the caller's transaction().
+    """
+    violators, params = violation_query(ONTOLOGY_CONSTRAINTS)
+    cur = conn.execute(f'''UPDATE relation_assertions SET status = 'ontology_violation'
+                          WHERE status IS NOT 'ontology_violation' AND id IN ({violators})''', params)
+    return cur.rowcount
+
+# Write statements as module constants: the same str object every call, so each is prepared
+# once and then served from the connection's statement cache.
+INSERT_ENTITY_SQL = '''INSERT INTO entities (id, name, type, description, keywords, source_knowledge_ids, confidence, doctrinal_context, goals, non_goals, search_text)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'''
+INSERT_EVIDENCE_SQL = "INSERT INTO evidence (id, source_knowledge_id, text_span) VALUES (?, ?, ?)"
+INSERT_RELATION_SQL = '''INSERT INTO relation_assertions 
+                         (id, knowledge_id, relationship_type_id, source_entity_id, target_entity_id, usage_context, semantic_properties, evidence_ids, 
+                          extraction_confidence, ontology_confidence, system_confidence, status, created_at, axis, polarity)
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'''
+INSERT_KNOWLEDGE_SQL = "INSERT INTO knowledge (id, content_raw, timestamp, related_entity_ids) VALUES (?, ?, ?, ?)"
+
+# Bulk writers: one executemany per table. The caller owns the transaction.
+def bulk_insert_entities(conn, rows):
+    conn.executemany(INSERT_ENTITY_SQL, rows)
+
+def bulk_insert_evidence(conn, rows):
+    conn.executemany(INSERT_EVIDENCE_SQL, rows)
+
+def bulk_insert_relation_assertions(conn, rows):
+    conn.executemany(INSERT_RELATION_SQL, rows)
+
 def save_knowledge_flow(text: str):
-    # 1. Extract
-    result = extract_data(text)
+    # 1. Extract, listing entities as they stream in
+    live = st.empty()
+    names = []
+    def on_entity(ent):
+        names.append(ent.name)
+        live.caption(f"Extracted so far: {', '.join(names)}")
+    try:
+        result = extract_data(text, on_entity=on_entity)
+    except ExtractionError as e:
+        st.error(str(e))
+        return
+    finally:
+        live.empty()
+    _persist_extraction(text, result)
+
+def save_knowledge_batch_flow(texts: List[str], marshal_k: int = None):
+    """Extract all chunks concurrently, then persist them one by one in input order.
+
+    With `marshal_k`, chunks are packed `marshal_k` per request instead of one request each.
+    """
+    results = extract_data_marshaled(texts, marshal_k) if marshal_k else extract_data_batch(texts)
+    for text, result in zip(texts, results):
+        if isinstance(result, ExtractionError):
+            st.error(str(result))
+            continue
+        _persist_extraction(text, result)
+
+@dataclass(slots=True)
+class PreparedExtraction:
+    """Rows and session objects for one extraction, built before anything is written."""
+    knowledge: KnowledgeEntry
+    entities: Dict[str, EntityNode] = field(default_factory=dict)
+    relations: List[RelationAssertion] = field(default_factory=list)
+    evidence: Dict[str, str] = field(default_factory=dict)
+    entity_rows: list = field(default_factory=list)
+    evidence_rows: list = field(default_factory=list)
+    relation_rows: list = field(default_factory=list)
+
+def prepare_extraction(text: str, result: ExtractionResult, rel_types_by_mname: Dict[str, RelationshipType],
+                       on_entity: Optional[Callable[[int, int, str], None]] = None,
+                       on_skip: Optional[Callable[[str], None]] = None) -> PreparedExtraction:
+    """Resolve and validate `result` against the active type registry (machine_name -> type).
+
+    Needs no Streamlit session: progress and skipped relations are reported through the callbacks.
+    """
+    prep = PreparedExtraction(KnowledgeEntry(content_raw=text))
+    knowledge_id = prep.knowledge.id
+    entity_name_map = {} # norm_name -> id
+    entity_conf_map = {} # norm_name -> confidence
+
+    total_ent = len(result.entities)
+    src_ids_json = dumps_json([knowledge_id])
+
+    for idx, raw in enumerate(result.entities):
+        norm_name = normalize_entity_name(raw.name)
+        entity_conf_map[norm_name] = raw.confidence
+        
+        # ALWAYS CREATE NEW (Immutable Extraction Pattern)
+        new_id = generate_id()
+        
+        prep.entity_rows.append((new_id, raw.name, raw.type.value, raw.description, dumps_json(raw.keywords), src_ids_json, raw.confidence,
+                                 raw.doctrinal_context, dumps_json(raw.goals), dumps_json(raw.non_goals), entity_search_text(raw.name, raw.keywords)))
+        prep.knowledge.related_entity_ids.append(new_id)
+        prep.entities[new_id] = EntityNode(
+            id=new_id,
+            name=raw.name,
+            type=raw.type,
+            description=raw.description,
+            keywords=raw.keywords,
+            source_knowledge_ids=[knowledge_id],
+            doctrinal_context=raw.doctrinal_context,
+            goals=raw.goals,
+            non_goals=raw.non_goals
+        )
+        
+        # Map for relationship resolution
+        entity_name_map[norm_name] = new_id
+        if on_entity: on_entity(idx + 1, total_ent, raw.name)
+
+    for rel in result.relationships:
+        # 1. Find Type
+        rel_type_obj = rel_types_by_mname.get(rel.machine_name)
+        if rel_type_obj is None:
+            if on_skip: on_skip(f"⏩ Skipping unknown relationship type: {rel.machine_name}")
+            continue
+        rel_type_id = rel_type_obj.id
+
+        # 2. Resolve IDs (using normalized names); relations only link entities of this extraction
+        src_norm = normalize_entity_name(rel.source_entity)
+        tgt_norm = normalize_entity_name(rel.target_entity)
+        
+        src_id = entity_name_map.get(src_norm)
+        tgt_id = entity_name_map.get(tgt_norm)
+        
+        if not src_id or not tgt_id:
+            continue
+
+        # 3. Full validation pipeline (rules, ontology confidence, schema checks); it hands back
+        # the ontology confidence of an accepted relation, so the rules run once.
+        ontology_conf = score_relation(rel, rel_type_obj, prep.entities[src_id], prep.entities[tgt_id])
+        if ontology_conf is None:
+            if on_skip: on_skip(f"❌ Rejected {rel.machine_name}: Validation Pipeline Failed.")
+            continue
+
+        # 4. Confidence Calculation
+        src_conf = entity_conf_map.get(src_norm, 1.0)
+        tgt_conf = entity_conf_map.get(tgt_norm, 1.0)
+        system_conf = min(rel.confidence, src_conf, tgt_conf, ontology_conf)
+        
+        # 5. Create Evidence
+        ev_id = generate_id()
+        prep.evidence_rows.append((ev_id, knowledge_id, rel.evidence_span))
+        prep.evidence[ev_id] = rel.evidence_span
+        
+        usage_id = generate_id()
+        props_json = dumps_json(rel.semantic_properties)
+        ev_ids_json = dumps_json([ev_id])
+        created_ts = datetime.now().isoformat()
+        
+        prep.relation_rows.append((usage_id, knowledge_id, rel_type_id, src_id, tgt_id, rel.usage_context.value, props_json, ev_ids_json, 
+                                   rel.confidence, ontology_conf, system_conf, "extracted", created_ts, rel.axis, rel.polarity))
+        prep.relations.append(RelationAssertion(
+             id=usage_id, knowledge_id=knowledge_id, relationship_type_id=rel_type_id,
+             source_entity_id=src_id, target_entity_id=tgt_id, usage_context=rel.usage_context.value,
+             semantic_properties=rel.semantic_properties, evidence_ids=[ev_id], 
+             extraction_confidence=rel.confidence, ontology_confidence=ontology_conf, system_confidence=system_conf, 
+             status="extracted", created_at=created_ts, axis=rel.axis, polarity=rel.polarity
+        ))
+    return prep
+
+def write_extraction(conn, prep: PreparedExtraction):
+    """Insert a prepared extraction; run it inside the caller's transaction()."""
+    bulk_insert_entities(conn, prep.entity_rows)
+    bulk_insert_evidence(conn, prep.evidence_rows)
+    bulk_insert_relation_assertions(conn, prep.relation_rows)
+    k = prep.knowledge
+    conn.execute(INSERT_KNOWLEDGE_SQL, (k.id, k.content_raw, str(k.timestamp), dumps_json(k.related_entity_ids)))
+
+def _persist_extraction(text: str, result: ExtractionResult):
     if not result.entities:
         st.warning("No entities found.")
         return
 
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    
-    # Buffers for atomic session update
-    new_entities_buffer = {}
-    new_relations_buffer = []
-    new_evidence_buffer = {}
-    
     try:
-        # 2. Save Knowledge Entry
-        new_knowledge = KnowledgeEntry(content_raw=text)
-        
-        # 3. Process Entities
-        final_entity_ids = []
-        entity_name_map = {} # norm_name -> id
-        entity_conf_map = {} # norm_name -> confidence
-    
-        progress_text = "Saving entities..."
-        my_bar = st.progress(0, text=progress_text)
-        total_ent = len(result.entities)
-
-        for idx, raw in enumerate(result.entities):
-            norm_name = normalize_entity_name(raw.name)
-            entity_conf_map[norm_name] = raw.confidence
-            
-            # ALWAYS CREATE NEW (Immutable Extraction Pattern)
-            new_id = str(uuid.uuid4())
-            
-            # Insert
-            c.execute('''INSERT INTO entities (id, name, type, description, keywords, source_knowledge_ids, confidence, doctrinal_context, goals, non_goals)
-                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                      (new_id, raw.name, raw.type.value, raw.description, json.dumps(raw.keywords), json.dumps([new_knowledge.id]), raw.confidence,
-                       raw.doctrinal_context, json.dumps(raw.goals), json.dumps(raw.non_goals)))
-            
-            final_entity_ids.append(new_id)
-            current_id = new_id
-            
-            # Prepare Session Object
-            new_entity = EntityNode(
-                id=new_id,
-                name=raw.name,
-                type=raw.type,
-                description=raw.description,
-                keywords=raw.keywords,
-                source_knowledge_ids=[new_knowledge.id],
-                doctrinal_context=raw.doctrinal_context,
-                goals=raw.goals,
-                non_goals=raw.non_goals
-            )
-            new_entities_buffer[new_id] = new_entity
-            
-            # Map for relationship resolution
-            entity_name_map[norm_name] = current_id
-            my_bar.progress((idx + 1) / total_ent, text=f"Saved entity: {raw.name}")
-
+        my_bar = st.progress(0, text="Saving entities...")
+        # Each progress() call is a widget round-trip; redraw ~20 times regardless of size
+        bar_step = max(1, len(result.entities) // 20)
+        def on_entity(done, total, name):
+            if done % bar_step == 0 or done == total:
+                my_bar.progress(done / total, text=f"Saved entity: {name}")
+        prep = prepare_extraction(text, result, st.session_state.rel_types_by_mname, on_entity, st.warning)
         my_bar.empty()
 
-        # B. Process Relationships
-        for rel in result.relationships:
-            # 1. Find Type
-            rel_type_id = None
-            rel_type_obj = None
-            for rtid, rt in st.session_state.relationship_types.items():
-                if rt.machine_name == rel.machine_name:
-                    rel_type_id = rtid
-                    rel_type_obj = rt
-                    break
-            
-            if not rel_type_id:
-                st.warning(f"⏩ Skipping unknown relationship type: {rel.machine_name}")
-                continue
-
-            # 2. Resolve IDs (using normalized names)
-            src_norm = normalize_entity_name(rel.source_entity)
-            tgt_norm = normalize_entity_name(rel.target_entity)
-            
-            src_id = entity_name_map.get(src_norm)
-            tgt_id = entity_name_map.get(tgt_norm)
-            
-            if not src_id or not tgt_id:
-                # Try simple match if normalized failed (fallback)
-                continue
-
-            # 3. Attributes & Validation
-            # NOTE: We must check session state AND our new buffer.
-            # But new entities are only in buffer.
-            # So usage of st.session_state.entities.get(src_id) fails if src_id is new.
-            # We must check new_entities_buffer first.
-            
-            src_ent = new_entities_buffer.get(src_id) or st.session_state.entities.get(src_id)
-            tgt_ent = new_entities_buffer.get(tgt_id) or st.session_state.entities.get(tgt_id)
-            
-            # --- FULL VALIDATION PIPELINE ---
-            # Using the new master validation function that combines rules, ontology confidence, and schema checks.
-            from validation.relation_validator import full_relation_validation, calculate_ontology_confidence
-            
-            if not full_relation_validation(rel, rel_type_obj, src_ent, tgt_ent):
-                st.warning(f"❌ Rejected {rel.machine_name}: Validation Pipeline Failed.")
-                continue
-
-            # 4. Confidence Calculation (Re-calculate for storage, though validated above)
-            src_conf = entity_conf_map.get(src_norm, 1.0)
-            tgt_conf = entity_conf_map.get(tgt_norm, 1.0)
-            
-            # Re-fetch for system confidence (full_validation returns bool, so we recalc score)
-            ontology_conf = calculate_ontology_confidence(rel, rel_type_obj, src_ent, tgt_ent)
-            
-            # (Rejection block removed as it's covered in full_relation_validation)
-            
-            system_conf = min(rel.confidence, src_conf, tgt_conf, ontology_conf)
-            
-            # 5. Create Evidence
-            ev_id = str(uuid.uuid4())
-            c.execute("INSERT INTO evidence (id, source_knowledge_id, text_span) VALUES (?, ?, ?)",
-                      (ev_id, new_knowledge.id, rel.evidence_span))
-            
-            # Buffer Evidence
-            new_evidence_buffer[ev_id] = rel.evidence_span
-            
-            usage_id = str(uuid.uuid4())
-            props_json = json.dumps(rel.semantic_properties)
-            ev_ids_json = json.dumps([ev_id])
-            created_ts = datetime.now().isoformat()
-            
-            c.execute('''INSERT INTO relation_assertions 
-                         (id, knowledge_id, relationship_type_id, source_entity_id, target_entity_id, usage_context, semantic_properties, evidence_ids, 
-                          extraction_confidence, ontology_confidence, system_confidence, status, created_at, axis, polarity)
-                         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                      (usage_id, new_knowledge.id, rel_type_id, src_id, tgt_id, rel.usage_context.value, props_json, ev_ids_json, 
-                       rel.confidence, ontology_conf, system_conf, "extracted", created_ts, rel.axis, rel.polarity))
-            
-            # Buffer Relation
-            ra = RelationAssertion(
-                 id=usage_id, knowledge_id=new_knowledge.id, relationship_type_id=rel_type_id,
-                 source_entity_id=src_id, target_entity_id=tgt_id, usage_context=rel.usage_context.value,
-                 semantic_properties=rel.semantic_properties, evidence_ids=[ev_id], 
-                 extraction_confidence=rel.confidence, ontology_confidence=ontology_conf, system_confidence=system_conf, 
-                 status="extracted", created_at=created_ts, axis=rel.axis, polarity=rel.polarity
-            )
-            new_relations_buffer.append(ra)
-            # We also need to buffer evidence map
-            # evidence_buffer[ev_id] = rel.evidence_span
-
-        # 4. Save Knowledge
-        c.execute('''INSERT INTO knowledge (id, content_raw, timestamp, related_entity_ids)
-                     VALUES (?, ?, ?, ?)''',
-                  (new_knowledge.id, new_knowledge.content_raw, str(new_knowledge.timestamp), json.dumps(final_entity_ids)))
-        
-        conn.commit()
+        # Flush buffered rows + Save Knowledge in one explicit transaction
+        with transaction() as conn:
+            write_extraction(conn, prep)
         
         # --- ATOMIC SESSION UPDATE ---
-        st.session_state.entities.update(new_entities_buffer)
-        st.session_state.relation_assertions.extend(new_relations_buffer)
-        st.session_state.knowledges.append(new_knowledge)
+        st.session_state.entities.update(prep.entities)
+        _index_relations(prep.relations)
         
         if "evidence" in st.session_state:
-            st.session_state.evidence.update(new_evidence_buffer)
+            st.session_state.evidence.update(prep.evidence)
         else:
-            st.session_state.evidence = new_evidence_buffer.copy()
+            st.session_state.evidence = prep.evidence.copy()
         
         st.success("Knowledge processed and saved successfully!")
         
     except Exception as e:
-        conn.rollback()
+        # transaction() has already rolled back
         st.error(f"Transaction Failed: {e}")
-    finally:
-        conn.close()
+
+def ingest_texts_offline(texts: List[str], poll_seconds: int = 30) -> List[Optional[ExtractionError]]:
+    """Extract `texts` through the Gemini Batch API and persist each successful result, without a Streamlit session.
+
+    The type registry is read from the database. Returns one entry per text: None once it is saved,
+    otherwise the ExtractionError that kept it out (nothing of that text is written).
+    Raises RuntimeError if the batch job as a whole fails.
+    """
+    init_db()
+    r_types = load_relationship_types()
+    rel_types_by_mname = {rt.machine_name: rt for rt in r_types.values() if not rt.deprecated}
+    results = extract_data_batch_offline(texts, format_type_constraints(r_types.values()), poll_seconds)
+
+    outcome = []
+    for text, result in zip(texts, results):
+        if isinstance(result, ExtractionError):
+            outcome.append(result)
+            continue
+        if not result.entities:
+            outcome.append(ExtractionError("No entities found."))
+            continue
+        prep = prepare_extraction(text, result, rel_types_by_mname, on_skip=logger.info)
+        with transaction() as conn:
+            write_extraction(conn, prep)
+        outcome.append(None)
+    return outcome
+
+def _as_merge_input(e: EntityNode) -> ExtractedEntity:
+    # synthesize_entity_info takes (EntityNode, ExtractedEntity); adapt the duplicate node
+    return ExtractedEntity(
+        name=e.name, type=e.type, description=e.description, keywords=e.keywords, confidence=1.0 # Dummy
+    )
 
 def perform_entity_merge(master_id: str, duplicate_id: str):
-    """Merge duplicate_id INTO master_id"""
+    """Merge duplicate_id INTO master_id. Raises SynthesisError (nothing is written) if synthesis fails."""
     e1 = st.session_state.entities[master_id]
     e2 = st.session_state.entities[duplicate_id]
     
-    # Needs ExtractedEntity-like object for synthesis? No, SynthesisResult works on strings.
-    # We call synthesis on e1 and e2.
-    # Wait, synthesis takes (EntityNode, ExtractedEntity).
-    # Here we have two EntityNodes.
-    # I should adjust synthesize_entity_info to accept two generic objects/dicts?
-    # Or just construct a dummy ExtractedEntity.
-    # Refactoring synthesis to take Strings is better.
-    # In my new synthesis.py, I defined: synthesize_entity_info(current_entity: EntityNode, new_info: ExtractedEntity)
-    # I can create a temporary ExtractedEntity from e2. (Adapter pattern)
-    
-    from extraction.models import ExtractedEntity
-    e2_adapter = ExtractedEntity(
-        name=e2.name, type=e2.type, description=e2.description, keywords=e2.keywords, confidence=1.0 # Dummy
-    )
-    
-    syn = synthesize_entity_info(e1, e2_adapter)
-    
-    # 2. Database Updates
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    syn = synthesize_entity_info(e1, _as_merge_input(e2))
+    _apply_entity_merge(master_id, duplicate_id, syn)
+    return syn
+
+def perform_entity_merges(pairs: List[tuple]) -> int:
+    """Merge many (master_id, duplicate_id) pairs; syntheses run concurrently, writes stay sequential.
+
+    Only pairs that share no entity are merged in one call, since a synthesis must see the
+    master's final description; overlapping pairs are left for the next scan. Failed syntheses are
+    reported and skipped. Returns the number of merges applied.
+    """
+    entities = st.session_state.entities
+    used = set()
+    batch = []
+    for master_id, duplicate_id in pairs:
+        if master_id in used or duplicate_id in used: continue
+        if master_id not in entities or duplicate_id not in entities: continue
+        used.update((master_id, duplicate_id))
+        batch.append((master_id, duplicate_id))
     
-    # Update Relations
-    c.execute("UPDATE relation_assertions SET source_entity_id = ? WHERE source_entity_id = ?", (master_id, duplicate_id))
-    c.execute("UPDATE relation_assertions SET target_entity_id = ? WHERE target_entity_id = ?", (master_id, duplicate_id))
+    results = synthesize_entity_info_batch([(entities[m], _as_merge_input(entities[d])) for m, d in batch])
+    merged = 0
+    for (master_id, duplicate_id), syn in zip(batch, results):
+        if isinstance(syn, ExtractionError):
+            st.error(f"{entities[duplicate_id].name} -> {entities[master_id].name}: {syn}")
+            continue
+        _apply_entity_merge(master_id, duplicate_id, syn)
+        merged += 1
+    return merged
+
+def _apply_entity_merge(master_id: str, duplicate_id: str, syn: SynthesisResult):
+    e1 = st.session_state.entities[master_id]
+    e2 = st.session_state.entities[duplicate_id]
     
+    # 2. Database Updates (one transaction)
     # Update Knowledge Links
     new_src_ids = list(set(e1.source_knowledge_ids + e2.source_knowledge_ids))
     
-    # Update Master Entity
-    c.execute("UPDATE entities SET description = ?, keywords = ?, source_knowledge_ids = ? WHERE id = ?",
-              (syn.new_description, json.dumps(syn.new_keywords), json.dumps(new_src_ids), master_id))
-              
-    # Delete Duplicate Entity
-    c.execute("DELETE FROM entities WHERE id = ?", (duplicate_id,))
-    
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        # Update Relations
+        conn.execute("UPDATE relation_assertions SET source_entity_id = ? WHERE source_entity_id = ?", (master_id, duplicate_id))
+        conn.execute("UPDATE relation_assertions SET target_entity_id = ? WHERE target_entity_id = ?", (master_id, duplicate_id))
+        
+        # Update Master Entity
+        conn.execute("UPDATE entities SET description = ?, keywords = ?, source_knowledge_ids = ?, search_text = ? WHERE id = ?",
+                     (syn.new_description, dumps_json(syn.new_keywords), dumps_json(new_src_ids),
+                      entity_search_text(e1.name, syn.new_keywords), master_id))
+                  
+        # Delete Duplicate Entity
+        conn.execute("DELETE FROM entities WHERE id = ?", (duplicate_id,))
     
     # 3. Session Update
-    e1.description = syn.new_description
-    e1.keywords = syn.new_keywords
+    e1.set_content(syn.new_description, syn.new_keywords)
     e1.source_knowledge_ids = new_src_ids
     st.session_state.entities[master_id] = e1
     del st.session_state.entities[duplicate_id]
     
-    for r in st.session_state.relation_assertions:
+    # Only the duplicate's own bucket needs rewiring
+    by_entity = st.session_state.relations_by_entity
+    master_bucket = by_entity.setdefault(master_id, {})
+    for ra_id, r in by_entity.pop(duplicate_id, {}).items():
         if r.source_entity_id == duplicate_id: r.source_entity_id = master_id
         if r.target_entity_id == duplicate_id: r.target_entity_id = master_id
-        
-    return syn
+        master_bucket[ra_id] = r
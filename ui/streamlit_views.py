@@ -1,32 +1,62 @@
 import streamlit as st
-import json
-import sqlite3
-import uuid
-import itertools
+from concurrent.futures import ThreadPoolExecutor
 from storage.sqlite_adapter import (
-    save_knowledge_flow, create_relationship_type, update_relationship_type, 
-    delete_relationship_type, perform_entity_merge, load_data_from_db, DB_PATH
+    save_knowledge_flow, save_knowledge_batch_flow, create_relationship_type, update_relationship_type, 
+    delete_relationship_type, perform_entity_merge, perform_entity_merges, load_data_from_db, schema_version, import_relationship_types, flag_ontology_violations, transaction, optimize_db,
+    fetch_entity_page, fetch_relation_page, relation_type_options, fetch_evidence_page, fetch_knowledge_page,
+    fetch_relations_by_knowledge
 )
-from extraction.similarity import calculate_entity_similarity
+from extraction.similarity import find_duplicate_candidates, entity_snapshot
+from extraction.errors import ExtractionError
+from storage.serialization import loads_json
+from ontology.enums import EntityType
 
+# Pager buttons change the page in on_click, which runs before the fragment reruns: the click
+# re-renders only its own fragment, with no extra st.rerun() pass over the whole app.
+def _turn_page(key: str, step: int):
+    st.session_state[key] += step
+
+@st.fragment
 def render_input_data():
     st.subheader("Input new knowledge into the system")
     txt_input = st.text_area("Enter text, notes, or documents:", height=200)
+    split_paragraphs = st.checkbox("Treat each paragraph as a separate entry (extracted in parallel)")
+    pack = st.checkbox("Pack paragraphs into shared requests (fewer calls under rate limits)", disabled=not split_paragraphs)
     
     if st.button("Process & Save to KB", type="primary"):
         if not txt_input:
             st.warning("Please enter some content!")
         else:
             with st.spinner("Brain OS is thinking..."):
-                save_knowledge_flow(txt_input)
+                chunks = [p.strip() for p in txt_input.split("\n\n") if p.strip()] if split_paragraphs else []
+                if len(chunks) > 1:
+                    save_knowledge_batch_flow(chunks, marshal_k=8 if pack else None)
+                else:
+                    save_knowledge_flow(txt_input)
 
+@st.fragment
 def render_view_knowledge():
     st.subheader("Raw Knowledge Base")
-    if not st.session_state.knowledges:
+    # Local aliases: every st.session_state attribute read goes through the proxy
+    ss = st.session_state
+    entities, r_types = ss.entities, ss.relationship_types
+    # Pagination: one page of entries (newest first) from SQLite; entries are never held in session state
+    ITEMS_PER_PAGE = 10
+    if "knowledge_page" not in ss: ss.knowledge_page = 1
+    total_items, page_items = fetch_knowledge_page((ss.knowledge_page - 1) * ITEMS_PER_PAGE, ITEMS_PER_PAGE)
+    if not page_items and ss.knowledge_page > 1:
+        ss.knowledge_page = 1
+        total_items, page_items = fetch_knowledge_page(0, ITEMS_PER_PAGE)
+    if not total_items:
         st.info("No data available.")
         return
+    total_pages = max(1, (total_items - 1) // ITEMS_PER_PAGE + 1)
+    curr = ss.knowledge_page
     
-    for k in reversed(st.session_state.knowledges):
+    # Only this page's relations, fetched in one query; names resolve against the in-memory entity dict
+    rels_by_knowledge = fetch_relations_by_knowledge([k.id for k in page_items])
+    
+    for k in page_items:
         with st.expander(f"📄 Knowledge ID: {k.id[:8]}... ({k.timestamp.strftime('%H:%M %d/%m')})"):
             st.markdown(f"**Original Content:**")
             st.info(k.content_raw)
@@ -34,63 +64,65 @@ def render_view_knowledge():
             st.markdown("**Related Entities:**")
             cols = st.columns(4)
             for i, ent_id in enumerate(k.related_entity_ids):
-                ent = st.session_state.entities.get(ent_id)
+                ent = entities.get(ent_id)
                 if ent:
                     cols[i % 4].button(f"🧬 {ent.name}", key=f"btn_k_{k.id}_{ent_id}", disabled=True)
             
             # Show relationships
-            if st.session_state.get("relation_assertions"):
-                k_rels = [u for u in st.session_state.relation_assertions if u.knowledge_id == k.id]
-                if k_rels:
-                    st.markdown("**Relationships Extracted:**")
-                    for rel in k_rels:
-                        r_type = st.session_state.relationship_types.get(rel.relationship_type_id)
-                        r_name = r_type.machine_name if r_type else "Unknown"
-                        
-                        src = st.session_state.entities.get(rel.source_entity_id)
-                        tgt = st.session_state.entities.get(rel.target_entity_id)
-                        src_name = src.name if src else "?"
-                        tgt_name = tgt.name if tgt else "?"
-                        
-                        st.caption(f"🔗 **{src_name}** _{r_name}_ **{tgt_name}**")
+            k_rels = rels_by_knowledge.get(k.id)
+            if k_rels:
+                st.markdown("**Relationships Extracted:**")
+                for rel in k_rels:
+                    r_type = r_types.get(rel.relationship_type_id)
+                    r_name = r_type.machine_name if r_type else "Unknown"
+                    
+                    src = entities.get(rel.source_entity_id)
+                    tgt = entities.get(rel.target_entity_id)
+                    src_name = src.name if src else "?"
+                    tgt_name = tgt.name if tgt else "?"
+                    
+                    st.caption(f"🔗 **{src_name}** _{r_name}_ **{tgt_name}**")
+
+    if total_pages > 1:
+        st.divider()
+        c1, c2, c3 = st.columns([1, 2, 1])
+        c1.button("Prev", key="kp_prev", disabled=curr==1, on_click=_turn_page, args=("knowledge_page", -1))
+        c2.markdown(f"<center>Page {curr}/{total_pages}</center>", unsafe_allow_html=True)
+        c3.button("Next", key="kp_next", disabled=curr==total_pages, on_click=_turn_page, args=("knowledge_page", 1))
 
+@st.fragment
 def render_view_entities():
     st.subheader("Entity Knowledge Graph")
     
-    col_search, col_stats = st.columns([3, 1])
+    col_search, col_type, col_stats = st.columns([3, 1, 1])
     with col_search:
         search_query = st.text_input("🔍 Search Entities (Name or Keywords):", placeholder="Type to filter...")
+    with col_type:
+        type_filter = st.selectbox("Type", ["All"] + [t.value for t in EntityType])
     with col_stats:
         st.metric("Total Entities", len(st.session_state.entities))
 
-    all_entities = list(st.session_state.entities.values())
-    if search_query:
-        query = search_query.lower()
-        filtered_entities = [
-            e for e in all_entities 
-            if query in e.name.lower() or any(query in k.lower() for k in e.keywords)
-        ]
-    else:
-        filtered_entities = all_entities
+    ITEMS_PER_PAGE = 10
+    if "entity_page" not in st.session_state: st.session_state.entity_page = 1
+    type_arg = None if type_filter == "All" else type_filter
+    total_items, page_items = fetch_entity_page((st.session_state.entity_page - 1) * ITEMS_PER_PAGE, ITEMS_PER_PAGE,
+                                                search_query or None, type_arg)
+    if not page_items and st.session_state.entity_page > 1:
+        # Filter shrank the result set below the current page
+        st.session_state.entity_page = 1
+        total_items, page_items = fetch_entity_page(0, ITEMS_PER_PAGE, search_query or None, type_arg)
         
-    if not filtered_entities:
+    if not page_items:
         st.info("No entities found.")
     else:
-        ITEMS_PER_PAGE = 10
-        total_items = len(filtered_entities)
         total_pages = (total_items - 1) // ITEMS_PER_PAGE + 1
         
-        if "entity_page" not in st.session_state: st.session_state.entity_page = 1
-        if st.session_state.entity_page > total_pages: st.session_state.entity_page = max(1, total_pages)
-        
         current_page = st.session_state.entity_page
         start_idx = (current_page - 1) * ITEMS_PER_PAGE
-        end_idx = min(start_idx + ITEMS_PER_PAGE, total_items)
+        end_idx = start_idx + len(page_items)
         
         st.caption(f"Showing **{start_idx + 1}-{end_idx}** of **{total_items}** results")
         
-        page_items = filtered_entities[start_idx:end_idx]
-        
         for ent in page_items:
             with st.expander(f"🧬 **{ent.name}**"):
                 c1, c2 = st.columns([1, 2])
@@ -119,16 +151,13 @@ def render_view_entities():
             st.divider()
             c1, c2, c3 = st.columns([1, 2, 1])
             with c1:
-                if st.button("◀️ Previous", disabled=(current_page == 1), key="btn_prev_ent"):
-                    st.session_state.entity_page -= 1
-                    st.rerun()
+                st.button("◀️ Previous", disabled=(current_page == 1), key="btn_prev_ent", on_click=_turn_page, args=("entity_page", -1))
             with c2:
                 st.markdown(f"<center>Page {current_page} of {total_pages}</center>", unsafe_allow_html=True)
             with c3:
-                if st.button("Next ▶️", disabled=(current_page == total_pages), key="btn_next_ent"):
-                    st.session_state.entity_page += 1
-                    st.rerun()
+                st.button("Next ▶️", disabled=(current_page == total_pages), key="btn_next_ent", on_click=_turn_page, args=("entity_page", 1))
 
+@st.fragment
 def render_view_relation_types():
     st.subheader("Semantic Relationship Registry (Schema)")
     
@@ -142,10 +171,12 @@ def render_view_relation_types():
                 create_relationship_type(new_machine, new_desc)
 
     st.divider()
-    if not st.session_state.get("relationship_types"):
+    ss = st.session_state
+    if not ss.get("relationship_types"):
         st.info("No relationships defined.")
     else:
-        for r_type in list(st.session_state.relationship_types.values()):
+        by_type = ss.relations_by_type
+        for r_type in list(ss.relationship_types.values()):
             with st.expander(f"🔗 **{r_type.machine_name}** ({r_type.category})"):
                 st.markdown(f"_{r_type.description}_")
                 c1, c2 = st.columns([4, 1])
@@ -159,35 +190,32 @@ def render_view_relation_types():
                     if st.button("🗑️ Delete", key=f"del_{r_type.id}", type="primary"):
                         delete_relationship_type(r_type.id)
                 
-                instances = [u for u in st.session_state.relation_assertions if u.relationship_type_id == r_type.id]
-                st.caption(f"Total Instances: **{len(instances)}**")
+                st.caption(f"Total Instances: **{len(by_type.get(r_type.id, ()))}**")
 
+@st.fragment
 def render_view_relationships():
     st.subheader("Relationship Instances (Knowledge Graph)")
-    if not st.session_state.relation_assertions:
+    ss = st.session_state
+    entities, r_types, evidence = ss.entities, ss.relationship_types, ss.evidence
+    if not ss.relation_assertions:
         st.info("No relationship instances extracted yet.")
         return
 
     col_filter, col_stats = st.columns([3, 1])
     with col_filter:
-        type_opts = sorted(list(set([st.session_state.relationship_types[u.relationship_type_id].machine_name for u in st.session_state.relation_assertions if u.relationship_type_id in st.session_state.relationship_types])))
-        sel_types = st.multiselect("Filter by Type", type_opts)
-    
-    filtered = st.session_state.relation_assertions
-    if sel_types:
-        valid_ids = [tid for tid, t in st.session_state.relationship_types.items() if t.machine_name in sel_types]
-        filtered = [u for u in filtered if u.relationship_type_id in valid_ids]
-    
-    with col_stats:
-        st.metric("Total Relations", len(filtered))
+        sel_types = st.multiselect("Filter by Type", relation_type_options())
     
     # Pagination
     ITEMS_PER_PAGE = 20
-    total_items = len(filtered)
+    if "rel_page" not in st.session_state: st.session_state.rel_page = 1
+    total_items, page_rels = fetch_relation_page((st.session_state.rel_page - 1) * ITEMS_PER_PAGE, ITEMS_PER_PAGE, sel_types)
+    if not page_rels and st.session_state.rel_page > 1:
+        st.session_state.rel_page = 1
+        total_items, page_rels = fetch_relation_page(0, ITEMS_PER_PAGE, sel_types)
     total_pages = max(1, (total_items - 1) // ITEMS_PER_PAGE + 1)
     
-    if "rel_page" not in st.session_state: st.session_state.rel_page = 1
-    if st.session_state.rel_page > total_pages: st.session_state.rel_page = 1
+    with col_stats:
+        st.metric("Total Relations", total_items)
     
     curr = st.session_state.rel_page
     start = (curr - 1) * ITEMS_PER_PAGE
@@ -195,11 +223,11 @@ def render_view_relationships():
     
     st.caption(f"Showing {start+1}-{min(end, total_items)} of {total_items}")
     
-    for u in filtered[start:end]:
-        r_type = st.session_state.relationship_types.get(u.relationship_type_id)
+    for u in page_rels:
+        r_type = r_types.get(u.relationship_type_id)
         r_name = r_type.machine_name if r_type else "Unknown"
-        src = st.session_state.entities.get(u.source_entity_id)
-        tgt = st.session_state.entities.get(u.target_entity_id)
+        src = entities.get(u.source_entity_id)
+        tgt = entities.get(u.target_entity_id)
         src_name = src.name if src else "?"
         tgt_name = tgt.name if tgt else "?"
         
@@ -209,7 +237,7 @@ def render_view_relationships():
                 # Evidence Lookup
                 if u.evidence_ids:
                     for eid in u.evidence_ids:
-                        txt = st.session_state.evidence.get(eid, "Missing")
+                        txt = evidence.get(eid, "Missing")
                         st.markdown(f"**Evidence:** \"{txt}\"")
                 else:
                     st.write("No evidence linked.")
@@ -222,76 +250,132 @@ def render_view_relationships():
                 if u.axis: st.caption(f"📐 Axis: {u.axis}")
                 if u.polarity: st.caption(f"🧭 Polarity: {u.polarity}")
                 st.caption(f"Created: {u.created_at}")
+                if u.status != "extracted": st.caption(f"⚠️ Status: {u.status}")
 
     # Pager
     if total_pages > 1:
         st.divider()
         c1, c2, c3 = st.columns([1, 2, 1])
-        if c1.button("Prev", key="rp_prev", disabled=curr==1):
-            st.session_state.rel_page -= 1
-            st.rerun()
+        c1.button("Prev", key="rp_prev", disabled=curr==1, on_click=_turn_page, args=("rel_page", -1))
         c2.markdown(f"<center>Page {curr}/{total_pages}</center>", unsafe_allow_html=True)
-        if c3.button("Next", key="rp_next", disabled=curr==total_pages):
-            st.session_state.rel_page += 1
-            st.rerun()
+        c3.button("Next", key="rp_next", disabled=curr==total_pages, on_click=_turn_page, args=("rel_page", 1))
 
+@st.fragment
 def render_view_evidence():
     st.subheader("Extraction Evidence Registry")
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    
-    c.execute("SELECT count(*) FROM evidence")
-    total = c.fetchone()[0]
+    ss = st.session_state
+    # The session holds every evidence span already; its size is the total without a count(*) scan
+    total = len(ss.evidence)
+    ITEMS_PER_PAGE = 10
+    total_pages = max(1, (total - 1) // ITEMS_PER_PAGE + 1)
     
-    page = st.number_input("Page", 1, max(1, (total//10)+1), 1)
-    offset = (page-1)*10
-    
-    c.execute("SELECT * FROM evidence LIMIT 10 OFFSET ?", (offset,))
-    rows = c.fetchall()
+    # Keyset pagination: the rowid each visited page starts after (the last entry is the current page)
+    if "ev_page_starts" not in ss: ss.ev_page_starts = [0]
+    starts = ss.ev_page_starts
+    rows = fetch_evidence_page(starts[-1], ITEMS_PER_PAGE)
+    if not rows and len(starts) > 1:
+        starts[:] = [0]
+        rows = fetch_evidence_page(0, ITEMS_PER_PAGE)
+    curr = len(starts)
     
     st.caption(f"Total Evidence: {total}")
-    for row in rows:
-        with st.expander(f"Evidence: {row['text_span'][:50]}..."):
-            st.write(f"**Full Span:** {row['text_span']}")
-            st.caption(f"Source ID: {row['source_knowledge_id']}")
-    conn.close()
+    for _, _, source_id, text_span in rows:
+        with st.expander(f"Evidence: {text_span[:50]}..."):
+            st.write(f"**Full Span:** {text_span}")
+            st.caption(f"Source ID: {source_id}")
+    
+    # rows can be empty when the session count is stale (e.g. the table was cleared elsewhere)
+    if total_pages > 1 and rows:
+        c1, c2, c3 = st.columns([1, 2, 1])
+        c1.button("Prev", key="ev_prev", disabled=curr==1, on_click=starts.pop)
+        c2.markdown(f"<center>Page {curr}/{total_pages}</center>", unsafe_allow_html=True)
+        c3.button("Next", key="ev_next", disabled=curr>=total_pages or len(rows) < ITEMS_PER_PAGE,
+                  on_click=starts.append, args=(rows[-1][0],))
+
+@st.cache_resource(show_spinner=False)
+def _scan_executor() -> ThreadPoolExecutor:
+    # One scan worker per server process: scans run off the script thread, one at a time
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="dedup-scan")
 
+@st.fragment(run_every=1)
+def _poll_dedup_scan():
+    """Progress of the background scan; publishes its candidates once it finishes."""
+    ss = st.session_state
+    future, progress, scan_key = ss.dedup_job
+    if not future.done():
+        st.progress(progress["done"] / progress["total"], text="Scanning for duplicates...")
+        return
+    del ss.dedup_job
+    try:
+        found = future.result()
+    except Exception as e:
+        st.error(f"Similarity scan failed: {e}")
+        return
+    # Drop pairs naming an entity that disappeared while the scan ran
+    entities = ss.entities
+    ss.dedup_candidates = [(e1.id, e2.id, scores["total"]) for e1, e2, scores in found
+                           if e1.id in entities and e2.id in entities]
+    ss.dedup_scan_key = scan_key
+    st.rerun()
+
+@st.fragment
 def render_entity_deduplication():
     st.subheader("Entity Identification & Deduplication")
-    if st.button("Run Similarity Scan"):
-         ents = list(st.session_state.entities.values())
-         if len(ents) < 2:
+    ss = st.session_state
+    # Every committed write advances the data version, so an unchanged (version, size) means the last scan still holds
+    scan_key = (schema_version(), len(ss.entities))
+    scanning = "dedup_job" in ss
+    if st.button("Run Similarity Scan", disabled=scanning):
+         if ss.get("dedup_scan_key") == scan_key:
+             st.caption("No changes since the last scan.")
+         elif len(ss.entities) < 2:
              st.info("Not enough entities.")
+             ss.dedup_candidates = []
          else:
-             found = []
-             bar = st.progress(0)
-             pairs = list(itertools.combinations(ents, 2))
-             total = len(pairs)
-             
-             for i, (e1, e2) in enumerate(pairs):
-                 if i % 10 == 0: bar.progress(i/total)
-                 scores = calculate_entity_similarity(e1, e2)
-                 if scores["total"] > 0.6: # Threshold
-                     found.append((e1, e2, scores))
-             bar.empty()
-             
-             if not found:
-                 st.success("No duplicates found.")
-             else:
-                 for e1, e2, scores in found:
-                     with st.container():
-                         st.markdown(f"**Cluster:** {e1.name} ↔ {e2.name} (Score: {scores['total']:.2f})")
-                         c1, c2 = st.columns(2)
-                         with c1: st.info(e1.description)
-                         with c2: st.info(e2.description)
-                         
-                         if st.button(f"Merge {e2.name} -> {e1.name}", key=f"merge_{e1.id}_{e2.id}"):
-                             perform_entity_merge(e1.id, e2.id)
-                             st.success("Merged!")
-                             st.rerun()
-                         st.divider()
+             # The worker scans frozen snapshots, never the live nodes; the page stays usable while it runs
+             progress = {"done": 0, "total": 1}
+             future = _scan_executor().submit(
+                 find_duplicate_candidates, [entity_snapshot(e) for e in ss.entities.values()], 0.6,
+                 lambda done, total: progress.update(done=done, total=total),
+                 ss.setdefault("dedup_block_cache", {}))
+             ss.dedup_job = (future, progress, scan_key)
+             scanning = True
+    if scanning:
+        _poll_dedup_scan()
+    elif ss.get("dedup_scan_key") == scan_key and not ss.get("dedup_candidates"):
+        st.success("No duplicates found.")
+
+    # Candidates live in session state so merge clicks survive the rerun; drop pairs already merged away
+    entities = ss.entities
+    pairs = [p for p in ss.get("dedup_candidates", []) if p[0] in entities and p[1] in entities]
+    ss.dedup_candidates = pairs
+    
+    # Merges rewrite entities, so they wait until a running scan has published its candidates
+    if len(pairs) > 1 and st.button(f"Merge All ({len(pairs)} candidates)", type="primary", disabled=scanning):
+        with st.spinner("Synthesizing merges..."):
+            merged = perform_entity_merges([(id1, id2) for id1, id2, _ in pairs])
+        # Keep failure messages on screen when nothing changed
+        if merged: st.rerun(scope="app")
+    
+    for id1, id2, total in pairs:
+        e1, e2 = entities[id1], entities[id2]
+        with st.container():
+            st.markdown(f"**Cluster:** {e1.name} ↔ {e2.name} (Score: {total:.2f})")
+            c1, c2 = st.columns(2)
+            with c1: st.info(e1.description)
+            with c2: st.info(e2.description)
+            
+            if st.button(f"Merge {e2.name} -> {e1.name}", key=f"merge_{e1.id}_{e2.id}", disabled=scanning):
+                try:
+                    perform_entity_merge(e1.id, e2.id)
+                except ExtractionError as e:
+                    st.error(str(e))
+                else:
+                    st.success("Merged!")
+                    st.rerun(scope="app")
+            st.divider()
 
+@st.fragment
 def render_ontology_import():
     st.subheader("Import Relationship Types via JSON")
     uploaded_file = st.file_uploader("Upload 'relation_types.json'", type=["json"])
@@ -299,61 +383,20 @@ def render_ontology_import():
     if uploaded_file:
         if st.button("Process Import"):
             try:
-                data = json.load(uploaded_file)
+                data = loads_json(uploaded_file.read())
                 types = data.get("relation_types", [])
                 
-                conn = sqlite3.connect(DB_PATH)
-                # Need Row factory
-                conn.row_factory = sqlite3.Row
-                c = conn.cursor()
-                
-                count = 0
-                for rt in types:
-                    machine_name = rt['machine_name']
-                    target_ver = rt.get('version', "1.0")
-                    
-                    c.execute("SELECT * FROM relationship_types WHERE machine_name = ?", (machine_name,))
-                    existing_rows = c.fetchall()
-                    
-                    existing_match = None
-                    # conn.row_factory = sqlite3.Row # Ensure (Removed redundant)
-                    for r in existing_rows:
-                        # row object access
-                        r_ver = r['version'] if 'version' in r.keys() and r['version'] else "1.0"
-                        if r_ver == target_ver:
-                            existing_match = r
-                            break
-                    
-                    props = json.dumps(rt.get('properties_schema', {}))
-                    allowed = json.dumps(rt.get('allowed_entity_types', {}))
-                    
-                    if existing_match:
-                        # Update
-                        c.execute('''UPDATE relationship_types 
-                                     SET description=?, category=?, directional=?, deterministic=?, allowed_entity_types=?, properties_schema=?, deprecated=?
-                                     WHERE id=?''',
-                                  (rt['description'], rt.get('category'), rt.get('directional', True), 
-                                   rt.get('deterministic', False), allowed, props, rt.get('deprecated', False), existing_match['id']))
-                    else:
-                        # Deprecate old
-                        if existing_rows:
-                            c.execute("UPDATE relationship_types SET deprecated=1 WHERE machine_name=?", (machine_name,))
-                        
-                        new_id = str(uuid.uuid4())
-                        c.execute('''INSERT INTO relationship_types 
-                                     (id, machine_name, description, category, directional, deterministic, allowed_entity_types, properties_schema, version, deprecated)
-                                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                                  (new_id, machine_name, rt['description'], rt.get('category'), 
-                                   rt.get('directional', True), rt.get('deterministic', False), allowed, props, target_ver, rt.get('deprecated', False)))
-                        count += 1
-                        
-                conn.commit()
-                conn.close()
+                # Type upserts and the violation re-check commit together, or not at all
+                with transaction() as conn:
+                    count = import_relationship_types(conn, types)
+                    # Existing assertions may now break the updated type definitions
+                    flagged = flag_ontology_violations(conn)
+                optimize_db()
                 st.success(f"Imported/Updated {count} types.")
-                st.cache_data.clear()
+                if flagged: st.warning(f"Flagged {flagged} existing relations that violate the updated ontology.")
                 # Reload data cleanly
                 load_data_from_db()
-                st.rerun()
+                st.rerun(scope="app")
                 
             except Exception as e:
                 st.error(f"Import failed: {e}")
@@ -1,40 +1,39 @@
+import logging
+from typing import Optional
 from extraction.models import ExtractedRelationship
 from ontology.relation_types import RelationshipType
 from ontology.schema import EntityNode
-from ontology.ontology_rules import ONTOLOGY_CONSTRAINTS, HEURISTIC_RULES, EVIDENCE_RULES
+from ontology.ontology_rules import applicable_rules
+
+logger = logging.getLogger(__name__)
 
 def calculate_ontology_confidence(rel: ExtractedRelationship, rel_type: RelationshipType, 
-                                  src: EntityNode, tgt: EntityNode) -> float:
+                                  src: EntityNode, tgt: EntityNode, reject_below: Optional[float] = None) -> float:
+    """Minimum score over the applicable rules (1.0 when none objects).
+
+    With `reject_below`, evaluation stops at the first score under it: the minimum can only fall further,
+    so the caller's accept/reject decision is already made (the returned score is then an upper bound).
+    """
+    # Only rules scoped to this type's machine_name / category / determinism are evaluated
+    mask = applicable_rules(rel_type)
     score = 1.0
-    reasons = []
+    reasons = []  # (kind, rule, reason); only formatted when DEBUG logging is on
     
-    # 1. Hard Constraints
-    for rule in ONTOLOGY_CONSTRAINTS:
+    # 1. Hard Constraints, 2. Heuristics, 3. Evidence
+    for kind, rule in mask:
         s, reason = rule.evaluate(rel, rel_type, src, tgt)
         if s == 0.0:
-            # Immediate rejection
-            print(f"⛔ Constraint Violated: {rule.id}: {reason}")
-            return 0.0 
+            # Immediate rejection: the min can only stay 0.0, skip the remaining rules
+            logger.debug("⛔ %s Violated: %s: %s", kind, rule.id, reason)
+            return 0.0
         
-        if s < 1.0:
-             score = min(score, s)
-             if reason: reasons.append(f"[Constraint] {rule.id}: {reason}")
-
-    # 2. Heuristics
-    for rule in HEURISTIC_RULES:
-        s, reason = rule.evaluate(rel, rel_type, src, tgt)
         if s < 1.0:
             score = min(score, s)
-            if reason: reasons.append(f"[Heuristic] {rule.id}: {reason}")
-
-    # 3. Evidence
-    for rule in EVIDENCE_RULES:
-        s, reason = rule.evaluate(rel, rel_type, src, tgt)
-        if s < 1.0:
-             # Evidence rules might be softer, but we use min for now strictly
-             score = min(score, s)
-             if reason: reasons.append(f"[Evidence] {rule.id}: {reason}")
+            if reason: reasons.append((kind, rule, reason))
+            if reject_below is not None and score < reject_below:
+                break
 
-    if score < 1.0:
-        print(f"⚠️ Ontology Confidence: {rel.machine_name} score={score}. Reasons: {reasons}")
+    if score < 1.0 and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("⚠️ Ontology Confidence: %s score=%s. Reasons: %s",
+                     rel.machine_name, score, [f"[{k}] {r.id}: {why}" for k, r, why in reasons])
     return score
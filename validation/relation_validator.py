@@ -1,31 +1,33 @@
+import logging
+from typing import Optional
 from extraction.models import ExtractedRelationship
 from ontology.relation_types import RelationshipType
 from ontology.schema import EntityNode
 
+logger = logging.getLogger(__name__)
+
 def validate_extracted_relationship(rel: ExtractedRelationship, rel_type: RelationshipType,
                                     source_entity: EntityNode, target_entity: EntityNode) -> bool:
     # 1. Check entity type
-    if rel_type.allowed_entity_types:
-        src_allowed = rel_type.allowed_entity_types.get("source", [])
-        tgt_allowed = rel_type.allowed_entity_types.get("target", [])
-        # EntityNode.type is Enum
+    if rel_type.allowed_sets:
+        src_allowed, tgt_allowed = rel_type.allowed_sets
+        # EntityNode.type is a str Enum: hashes like its value, so frozenset membership works
         if source_entity.type not in src_allowed: 
-             print(f"Source Type Mismatch: {source_entity.type} not in {src_allowed}")
+             logger.debug("Source Type Mismatch: %s not in %s", source_entity.type, src_allowed)
              return False
         if target_entity.type not in tgt_allowed:
-             print(f"Target Type Mismatch: {target_entity.type} not in {tgt_allowed}")
+             logger.debug("Target Type Mismatch: %s not in %s", target_entity.type, tgt_allowed)
              return False
 
     # 2. Check semantic properties schema
-    if rel_type.properties_schema:
-        for key, schema in rel_type.properties_schema.items():
-            if key not in rel.semantic_properties:
-                print(f"Missing Property: {key}")
-                return False
-            if schema.get("type") == "enum":
-                if rel.semantic_properties[key] not in schema.get("values", []):
-                    print(f"Invalid Enum: {key}={rel.semantic_properties[key]}")
-                    return False
+    props = rel.semantic_properties
+    for key, allowed in rel_type.property_checks:
+        if key not in props:
+            logger.debug("Missing Property: %s", key)
+            return False
+        if allowed is not None and props[key] not in allowed:
+            logger.debug("Invalid Enum: %s=%s", key, props[key])
+            return False
     return True
 
 from validation.rules_registry import VALIDATION_RULES
@@ -40,10 +42,10 @@ def run_all_validation_rules(rel: ExtractedRelationship) -> bool:
             return False
     return True
 
-def full_relation_validation(rel: ExtractedRelationship, rel_type: RelationshipType, 
-                             source_entity: EntityNode, target_entity: EntityNode) -> bool:
+def score_relation(rel: ExtractedRelationship, rel_type: RelationshipType,
+                   source_entity: EntityNode, target_entity: EntityNode) -> Optional[float]:
     """
-    Master validation pipeline:
+    Master validation pipeline; returns None if the relation is rejected, else its ontology confidence:
     1. Registered Validation Rules (Pre-check)
     2. Ontology Confidence Scoring (Must be >= 0.5)
     3. Schema Validation (Types, Properties)
@@ -51,17 +53,22 @@ def full_relation_validation(rel: ExtractedRelationship, rel_type: RelationshipT
     
     # 1. Pre-validation rules (Hard blocks like 'is_a' misuse, question evidence)
     if not run_all_validation_rules(rel):
-        return False
+        return None
 
     # 2. Ontology Confidence
-    # We use a threshold of 0.5 as established in sqlite_adapter
-    conf = calculate_ontology_confidence(rel, rel_type, source_entity, target_entity)
+    # We use a threshold of 0.5 as established in sqlite_adapter.
+    # An accepted score never tripped reject_below, so it is the exact minimum over the rules.
+    conf = calculate_ontology_confidence(rel, rel_type, source_entity, target_entity, reject_below=0.5)
     if conf < 0.5:
-        print(f"⛔ Ontology Confidence Rejected: {conf}")
-        return False
+        logger.debug("⛔ Ontology Confidence Rejected: %s", conf)
+        return None
 
     # 3. Schema / Type Validation
     if not validate_extracted_relationship(rel, rel_type, source_entity, target_entity):
-        return False
+        return None
 
-    return True
+    return conf
+
+def full_relation_validation(rel: ExtractedRelationship, rel_type: RelationshipType, 
+                             source_entity: EntityNode, target_entity: EntityNode) -> bool:
+    return score_relation(rel, rel_type, source_entity, target_entity) is not None